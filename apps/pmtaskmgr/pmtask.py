@@ -12,4 +12,8 @@ class PMTask:
         self.cron = self._task.cron
         if not (self.name or self.cron):
             raise ValueError("task must have both a name and a cron")
-        pass
\ No newline at end of file
+        pass
+
+    def data_changed(self, name: str = None):
+        ## tell the task manager (and through it, PyMirror) that this task wrote new data
+        self.pmtm.data_changed(name or self.name)
\ No newline at end of file
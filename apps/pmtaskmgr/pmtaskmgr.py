@@ -1,34 +1,49 @@
+import sys
+from glslib.timeline import timeline
+if __name__ == "__main__" and any(arg.startswith("--profile") for arg in sys.argv):
+    timeline.start() ## before the imports below, so they show up in the startup profile
+
 import argparse
 from dataclasses import dataclass
 import importlib
 import os
-import sys
 import time
 import traceback
+from datetime import datetime
+import requests
 from dotenv import load_dotenv
 from munch import DefaultMunch
 
 from glslib.glsdb import GLSDb
-from glslib.to_types import to_munch
+from glslib.to_types import to_munch, to_secs
 from pmtask import PMTask
 from glslib.crontab import Crontab
 from glslib.strings import expand_dict, snake_to_pascal
 from glslib.gson import json_read
 from glslib.dicts import from_dict, munchify
-from glslib.logger import _debug
+from glslib.logger import _debug, _error
+from tables.data_version_table import DataVersionTable
 
 @from_dict
 @dataclass
 class PMTaskMgrConfig:
     pmdb: dict
     tasks: list[dict]
+    notify_url: str = None  ## eg: http://localhost:8080/event (PyMirror's PMServer)
 
 class PMTaskMgr:
     def __init__(self, config_fname: str):
-        self._config = self._load_config(config_fname)
-        self.pmdb: GLSDb = GLSDb(self._config.pmdb.url)
+        with timeline.span("load config"):
+            self._config = self._load_config(config_fname)
+        ## task writes are batched and flushed once per run (or every pmdb.flush_time)
+        with timeline.span("pmdb connect"):
+            self.pmdb: GLSDb = GLSDb(self._config.pmdb.url, write_behind=True, flush_secs=to_secs(self._config.pmdb.flush_time or 0))
+            self.pmdb.create_table(DataVersionTable)
+            self.versions: dict = {rec.name: rec.version for rec in self.pmdb.get_all(DataVersionTable)}
+        self.changed: dict = {}  # name -> the version queued with its data (not in self.versions until it's flushed)
         self.tasks: list[PMTask] = []
-        self._load_tasks()
+        with timeline.span("load tasks"):
+            self._load_tasks()
         self.task_dict: dict = self._make_task_dict()
         self.cronlist = self._make_cronlist()
         self.crontab = Crontab(self.cronlist)
@@ -49,6 +64,37 @@ class PMTaskMgr:
             task_dict[task.name] = task
         return task_dict
 
+    def data_changed(self, name: str):
+        ## queue the next version now so it is written in the same flush as the data
+        if name in self.changed:
+            return
+        self.changed[name] = (self.versions.get(name) or 0) + 1
+        self.pmdb.upsert_many(DataVersionTable, [dict(name=name, version=self.changed[name], updated_time=datetime.now())])
+
+    def _notify(self, changed: dict):
+        if not self._config.notify_url:
+            return
+        for name, version in changed.items():
+            event = {"event": "DataChangedEvent", "name": name, "version": version}
+            try:
+                requests.post(self._config.notify_url, json=event, timeout=1)
+            except Exception as e:
+                ## PyMirror may not be running; its tiles will catch up on their own timers
+                _debug("notify failed:", self._config.notify_url, e)
+
+    def flush(self):
+        changed, self.changed = self.changed, {}
+        try:
+            self.pmdb.flush()
+        except Exception as e:
+            ## eg: the database is locked by a reader; the writes (and their versions) stay queued and the next flush retries them
+            _error("flush failed, will retry:", e)
+            self.changed = {**changed, **self.changed}
+            return
+        ## only now are the versions in the database
+        self.versions.update(changed)
+        self._notify(changed)
+
     def _load_config(self, config_fname) -> DefaultMunch:
         # read .env file if it exists
         load_dotenv()
@@ -99,25 +145,39 @@ class PMTaskMgr:
             ## create an instance of the class (module)
             ## and pass the PyMirror instance and the module config to it
             ## See pymirror.PMTile for the expected constructor
-            obj = clazz(self, task_config)
+            with timeline.span(f"{clazz_name}.__init__", task=task_config["name"]):
+                obj = clazz(self, task_config)
 
             ## add the module to the list of modules
             self.tasks.append(obj)
 
-    def run(self):
+    def run(self, profile_startup: str = None):
         ## execute each task first time around
-        for task in self.tasks:
-             _debug(task.name)
-             task.exec()
-
-        while True:
-            task_names = self.crontab.check()
-            _debug(task_names)
-            for task_name in task_names: 
-                _debug("calling", task_name)
-                task = self.task_dict[task_name]
-                task.exec()
-            time.sleep(1)
+        with timeline.span("first run"):
+            for task in self.tasks:
+                _debug(task.name)
+                with timeline.span(f"{task.name}.exec"):
+                    task.exec()
+            with timeline.span("flush"):
+                self.flush()
+        if timeline.enabled:
+            timeline.stop()
+            timeline.write(profile_startup)
+            print(timeline.summary())
+
+        try:
+            while True:
+                task_names = self.crontab.check()
+                _debug(task_names)
+                for task_name in task_names: 
+                    _debug("calling", task_name)
+                    task = self.task_dict[task_name]
+                    task.exec()
+                if self.pmdb.has_pending() and self.pmdb.is_flush_due():
+                    self.flush()
+                time.sleep(1)
+        finally:
+            self.flush()
             
 def my_excepthook(exc_type, exc_value, exc_traceback):
     tb = traceback.extract_tb(exc_traceback)
@@ -139,7 +199,18 @@ if __name__ == "__main__":
             help="Path to config JSON file (default: config.json)"
         )
 
+        parser.add_argument(
+            "--profile-startup", "--profile_startup",
+            dest="profile_startup",
+            metavar="PREFIX",
+            nargs="?",
+            const="taskmgr_startup",
+            help="Profile startup through the first run of every task; writes PREFIX.trace.json and PREFIX.txt"
+        )
+
         args = parser.parse_args()
+        if args.profile_startup:
+            timeline.start()
         pmtaskmgr = PMTaskMgr(args.config)
-        pmtaskmgr.run()
+        pmtaskmgr.run(args.profile_startup)
     main()
\ No newline at end of file
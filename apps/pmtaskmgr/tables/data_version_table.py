@@ -0,0 +1,12 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+## one row per data set written by pmtaskmgr (task name or calendar name)
+## the version is bumped in the same transaction as the data it describes
+class DataVersionTable(Base):
+    __tablename__ = 'data_version'
+    name = Column(String, primary_key=True)
+    version = Column(Integer)
+    updated_time = Column(DateTime)
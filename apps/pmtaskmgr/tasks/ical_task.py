@@ -1,5 +1,4 @@
 from datetime import datetime, timedelta
-from sqlalchemy.exc import IntegrityError
 
 from pmtask import PMTask
 from tables.ical_table import IcalTable
@@ -17,10 +16,11 @@ class IcalTask(PMTask):
         self.calendar_name = self._task.calendar_name
 
     def _add_new_events(self, events):
+        records = []
         for _event in events:
             _event["uid"] = make_hashcode(_event["dtstart$"], _event["dtend$"], _event["all_day"], _event["summary"], _event["description"])
             event = to_munch(_event)
-            record = IcalTable(
+            records.append(dict(
                 calendar_name = self.calendar_name,
                 all_day = event.all_day,
                 dtstart=to_naive(event.dtstart),
@@ -31,25 +31,21 @@ class IcalTask(PMTask):
                 description=event.description,
                 rrule=event.rrule,
                 uid=event.uid
-            )
-            try:
-                self.pmdb.upsert(record)
-            except IntegrityError as e:
-                    ## it's okay - duplicate entries are ignored
-                    continue
-            else:
-                _debug("ADDED:", record.uid, record.summary, record.description)
-
+            ))
+        ## duplicate uids are folded into one row by ON CONFLICT(uid)
+        self.pmdb.upsert_many(IcalTable, records, index_elements=["uid"])
+        _debug("UPSERTED:", len(records))
 
     def _remove_deleted_events(self, events):
         ## GLS: Need to handle special case of individual dates removed from repeating events
-        event_uids = [event["uid"] for event in events]
+        event_uids = set(event["uid"] for event in events)
         records = self.pmdb.get_all(IcalTable)
+        deleted_uids = []
         for record in records:
              if record.uid not in event_uids:
                   _debug("REMOVING:", record.uid, record.summary, record.description)
-                  self.pmdb.delete(record)
-             pass
+                  deleted_uids.append(record.uid)
+        self.pmdb.delete_many(IcalTable, deleted_uids, column="uid")
 
     def exec(self):
             response: requests.Response = requests.get(self.url)
@@ -62,4 +58,6 @@ class IcalTask(PMTask):
                 events = ical_parser.parse(now, then)
                 self._add_new_events(events)
                 self._remove_deleted_events(events)
+                ## IcalTile reads by calendar name, not task name
+                self.data_changed(self.calendar_name)
             return
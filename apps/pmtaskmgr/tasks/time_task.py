@@ -5,7 +5,6 @@ from pmtask import PMTask
 from glslib.logger import _debug
 
 from tables.time_table import TimeTable
-from glslib.to_types import to_dict
 
 class TimeTask(PMTask):
     def __init__(self, pmtm, config):
@@ -23,7 +22,7 @@ class TimeTask(PMTask):
         utc_date = utc.strftime("%Y-%m-%d")
         utc_time = utc.strftime("%H:%M:%S")
         utc_datetime = utc.strftime("%Y-%m-%d %H:%M:%S")
-        timerec = TimeTable(
+        timerec = dict(
             id=0,
             epoch=now,
             local_date=local_date,
@@ -33,7 +32,5 @@ class TimeTask(PMTask):
             utc_time=utc_time,
             utc_datetime=utc_datetime
         )
-        _debug(to_dict(timerec))
-        self.pmdb.upsert(timerec)
-        record = self.pmdb.get(TimeTable, 0)
-        _debug(to_dict(record))
\ No newline at end of file
+        _debug(timerec)
+        self.pmdb.upsert_many(TimeTable, [timerec])
\ No newline at end of file
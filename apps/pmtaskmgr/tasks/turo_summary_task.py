@@ -0,0 +1,103 @@
+import calendar
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from pmtask import PMTask
+from glslib.glsdb import GLSDb
+from glslib.logger import _debug
+
+from tables.turo_summary_table import TRIPS, TuroDailySummaryTable, TuroMonthlySummaryTable, TuroSummaryStateTable, trips_fingerprint
+
+## a cheap per-vehicle summary of the trips that changes when one is added, removed or edited
+## (the same fingerprint TuroAggregates uses for the whole table)
+FINGERPRINT_QUERY = select(TRIPS.c.vehicle_nickname, *trips_fingerprint()).group_by(TRIPS.c.vehicle_nickname)
+
+class TuroSummaryTask(PMTask):
+    """
+    Keeps the turo_daily / turo_monthly summary tables (tables/turo_summary_table.py)
+    in the turo database up to date.
+    Only the vehicles whose trips changed since the last run are recomputed,
+    and each run is written in one transaction, so the tiles never see half a summary.
+    config: database_url (the turo database), statuses (the trips that count as booked days)
+    """
+    def __init__(self, pmtm, config):
+        super().__init__(pmtm, config)
+        self.turo_db = GLSDb(self._task.database_url)
+        self.statuses = list(self._task.statuses or ["Booked", "In-progress", "Completed"])
+        for table in (TuroDailySummaryTable, TuroMonthlySummaryTable, TuroSummaryStateTable):
+            self.turo_db.create_table(table)
+
+    def _fingerprints(self) -> dict:
+        with self.turo_db.engine.connect() as conn:
+            return {row[0]: repr(tuple(row[1:])) for row in conn.execute(FINGERPRINT_QUERY)}
+
+    def _rows(self, sql: str, params: dict = None) -> list:
+        with self.turo_db.engine.connect() as conn:
+            return conn.execute(self.turo_db.prepare(sql), params or {}).all()
+
+    def _trips(self, nicknames: list) -> list:
+        binds = ", ".join(f":nickname_{i}" for i in range(len(nicknames)))
+        sql = f"""
+            SELECT vehicle_nickname, trip_status, trip_start, trip_end, trip_days, total_earnings, distance_traveled
+            FROM trips
+            WHERE vehicle_nickname IN ({binds})
+        """
+        return self.turo_db.query(sql, {f"nickname_{i}": nickname for i, nickname in enumerate(nicknames)})
+
+    def _summarize(self, trips: list):
+        daily = {}  # (nickname, date) -> [earnings, distance, trips]
+        monthly = {}  # (nickname, year, month, status) -> [earnings, days, trips, distance, {booked dates}]
+        for trip in trips:
+            nickname, status = trip["vehicle_nickname"], trip["trip_status"]
+            start, end = trip["trip_start"], trip["trip_end"]
+            days = trip["trip_days"] or 0
+            earnings = trip["total_earnings"] or 0
+            distance = trip["distance_traveled"] or 0
+            if isinstance(end, datetime):
+                month = monthly.setdefault((nickname, end.year, end.month, status), [0, 0, 0, 0, set()])
+                month[0] += earnings
+                month[1] += days
+                month[2] += 1
+                month[3] += distance
+            if status not in self.statuses or not isinstance(start, datetime):
+                continue
+            n_days = max(days, 1)
+            for i in range(n_days):
+                the_date = start.date() + timedelta(days=i)
+                day = daily.setdefault((nickname, the_date), [0, 0, 0])
+                day[0] += earnings / n_days
+                day[1] += distance / n_days
+                day[2] += 1
+                monthly.setdefault((nickname, the_date.year, the_date.month, status), [0, 0, 0, 0, set()])[4].add(the_date)
+        daily_rows = [
+            dict(vehicle_nickname=nickname, date=the_date, earnings=round(earnings, 2), distance=round(distance, 1), trips=n)
+            for (nickname, the_date), (earnings, distance, n) in daily.items()
+        ]
+        monthly_rows = [
+            dict(vehicle_nickname=nickname, year=year, month=month, trip_status=status,
+                 earnings=round(earnings, 2), days=days, trips=n, distance=distance, booked_days=len(booked),
+                 utilization=round(len(booked) / calendar.monthrange(year, month)[1] * 100, 1))
+            for (nickname, year, month, status), (earnings, days, n, distance, booked) in monthly.items()
+        ]
+        return daily_rows, monthly_rows
+
+    def exec(self):
+        fingerprints = self._fingerprints()
+        state = {nickname: fingerprint for nickname, fingerprint in self._rows(
+            f"SELECT vehicle_nickname, fingerprint FROM {TuroSummaryStateTable.__tablename__}")}
+        changed = [nickname for nickname, fingerprint in fingerprints.items() if state.get(nickname) != fingerprint]
+        removed = [nickname for nickname in state if nickname not in fingerprints]
+        if not (changed or removed):
+            _debug("turo_summary: no trips changed")
+            return
+        daily_rows, monthly_rows = self._summarize(self._trips(changed)) if changed else ([], [])
+        now = datetime.now()
+        state_rows = [dict(vehicle_nickname=nickname, fingerprint=fingerprints[nickname], updated_time=now) for nickname in changed]
+        with self.turo_db.engine.begin() as conn:
+            for table, rows in ((TuroDailySummaryTable, daily_rows), (TuroMonthlySummaryTable, monthly_rows), (TuroSummaryStateTable, state_rows)):
+                conn.execute(delete(table.__table__).where(table.__table__.c.vehicle_nickname.in_(changed + removed)))
+                if rows:
+                    conn.execute(insert(table.__table__), rows)
+        _debug(f"turo_summary: {len(changed)} vehicles recomputed, {len(removed)} removed ({len(daily_rows)} days, {len(monthly_rows)} months)")
+        self.data_changed()
@@ -6,6 +6,7 @@ from tables.web_api_table import WebApiTable
 from glslib.gson import json_dumps, json_loads
 from glslib.to_types import to_secs
 from glslib.logger import _debug, _error
+from glslib.payload import pack_payload
 
 import requests
 
@@ -13,6 +14,7 @@ class WebApiTask(PMTask):
     def __init__(self, pmtm, config):
         super().__init__(pmtm, config)
         self.pmdb.create_table(WebApiTable, checkfirst=True, force=False)
+        self.pmdb.add_columns(WebApiTable)
         record = self.pmdb.get_where(WebApiTable, WebApiTable.name == self.name)
         if not record:
             record = WebApiTable(
@@ -33,8 +35,12 @@ class WebApiTask(PMTask):
         if not record:
             _debug(f"record not found for {self.name}")
             return
-        if record.last_time:
-            elapsed = time.time() - record.last_time.timestamp()
+        ## the last result may still be waiting for the write-behind flush
+        queued = self.pmdb.pending_upsert(WebApiTable, (record.id,))
+        last_time = queued.get("last_time", record.last_time)
+        result_hash = queued.get("result_hash", record.result_hash)
+        if last_time:
+            elapsed = time.time() - last_time.timestamp()
             if elapsed < record.rate_limit_secs:
                 _debug(f"rate limit not reached for {self.name}, elapsed {elapsed} secs")
                 return
@@ -43,10 +49,18 @@ class WebApiTask(PMTask):
             response: requests.Response = requests.get(record.url, params=params)
             rc = response.status_code
             if rc == 200:
-                record.last_time = datetime.now()
-                record.last_rc = rc
-                record.result_text = response.text
-                self.pmdb.upsert(record)
+                result = dict(id=record.id, last_time=datetime.now(), last_rc=rc)
+                payload = pack_payload(response.text)
+                if payload["hash"] != result_hash:
+                    result.update(
+                        result_text=None,
+                        result_hash=payload["hash"],
+                        result_zip=payload["zip"],
+                        result_snapshot=payload["snapshot"],
+                    )
+                self.pmdb.upsert_many(WebApiTable, [result])
+                if "result_hash" in result:
+                    self.data_changed()
             else:
                 _error(response)
                 _error(response.text)
@@ -1,4 +1,4 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
 from datetime import datetime
 
@@ -43,6 +43,8 @@ class PMPlotTraceConfig:
     data: list = field(default_factory=list) 
     scale: float = 1.0
     column: str = None   
+    downsample: str = "minmax" # or "lttb" or None: thin line traces to ~2 points per pixel column
+    skip_overlapping_labels: bool = False # line traces: leave out a label that would overlap the previous one
     _width: str = None
 
 @dataclass
@@ -61,6 +63,46 @@ class PMPointConfig:
     label: str = None
     halign: str = "center"
     _width: float = None # scaled relative to x-axis
+    x: float = None # overrides x_axis.data[i] (set by add_trace(x=...) and downsampling)
+
+def _in_order(*points):
+    """ The points that aren't None, without repeats, in x order """
+    result = []
+    for point in sorted((p for p in points if p is not None), key=lambda p: p.x):
+        if not result or result[-1] is not point:
+            result.append(point)
+    return result
+
+def _lttb(points: list, n_out: int, to_float) -> list:
+    """ Largest-Triangle-Three-Buckets: n_out of points (with x and y set) that keep the shape of the line """
+    n = len(points)
+    if n <= n_out or n_out < 3:
+        return points
+    xs = [to_float(p.x) for p in points]
+    ys = [to_float(p.y) for p in points]
+    result = [points[0]]
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        ## average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+        ## pick the point in this bucket that makes the largest triangle with a and the average
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        result.append(points[best])
+        a = best
+    result.append(points[-1])
+    return result
 
 class PMPlotComponent(PMComponent):
     def __init__(
@@ -80,23 +122,60 @@ class PMPlotComponent(PMComponent):
         self.y_axis._size = self.rect.height - self.y_axis.margin * 2
         self.traces = []
 
-
     def is_dirty(self):
         return self._dirty
 
     def clean(self):
         self._dirty = False
 
-    def add_trace(self, trace_config: PMPlotTraceConfig, data=[]):
-        _debug(f"Adding trace with data: {trace_config.data}, color: {trace_config.color}, line_width: {trace_config.line_width}, label_format: {trace_config.label_format}")
+    def add_trace(self, trace_config: PMPlotTraceConfig, data=[], x=None):
+        """ Add a trace; x (one value per point) is used instead of x_axis.data, and lets line traces be downsampled """
+        _debug(f"Adding trace with {len(data or trace_config.data)} points, color: {trace_config.color}, line_width: {trace_config.line_width}, label_format: {trace_config.label_format}")
         if data:
             trace_config.data = data
         self.traces.append(trace_config)
         for i, point in enumerate(trace_config.data):
             if type(point) != PMPointConfig:
                 trace_config.data[i] = PMPointConfig(y=point)
+        if x is not None:
+            for point, x_value in zip(trace_config.data, x):
+                point.x = x_value
+            if trace_config.type != "bar" and trace_config.downsample:
+                trace_config.data = self.downsample(trace_config.data, trace_config.downsample)
         self._dirty = True
 
+    def downsample(self, points: list, method: str = "minmax", n_columns: int = None) -> list:
+        """ Thin points (with x set, in x order) to about 2 per pixel column of the plot,
+        keeping what the eye would see: "minmax" keeps each column's lowest and highest point
+        (and a gap, if the column has one); "lttb" is Largest-Triangle-Three-Buckets (gaps are dropped).
+        """
+        n_columns = int(n_columns or self.x_axis._size)
+        if n_columns <= 0 or len(points) <= n_columns * 2:
+            return points
+        if method == "lttb":
+            return _lttb([p for p in points if p.y is not None], n_columns * 2, self._to_float)
+        ## the axis limits may be left unset (null); then the columns span the trace's own x range
+        lo = self._to_float(self.x_axis.min if self.x_axis.min is not None else points[0].x)
+        hi = self._to_float(self.x_axis.max if self.x_axis.max is not None else points[-1].x)
+        k = n_columns / ((hi - lo) or 1)
+        result = []
+        column = low = high = gap = None
+        for point in points:
+            c = int((self._to_float(point.x) - lo) * k)
+            if c != column:
+                result.extend(_in_order(low, high, gap))
+                column, low, high, gap = c, None, None, None
+            if point.y is None:
+                gap = gap or point
+            else:
+                if low is None or point.y < low.y:
+                    low = point
+                if high is None or point.y > high.y:
+                    high = point
+        result.extend(_in_order(low, high, gap))
+        _debug(f"downsample: {len(points)} -> {len(result)} points ({n_columns} columns)")
+        return result
+
     def _to_float(self,val):
         if val is None:
             return None
@@ -176,43 +255,71 @@ class PMPlotComponent(PMComponent):
             bm.text_box(tic_rect, label)
             val += tic_interval
 
+    def _scaled(self, values, axis, origin, direction):
+        """ Screen coordinates for all of values (None stays None), in one pass """
+        to_float = self._to_float
+        lo, hi = to_float(axis.min), to_float(axis.max)
+        k = direction * axis._size / (hi - lo)
+        return [None if v is None else origin + (to_float(v) - lo) * k for v in values]
+
+    def _label_points(self, bm: PMBitmap, xs, labels, skip_overlapping: bool = False):
+        """ Indexes of the points to label; with skip_overlapping, labels that would overlap the previous one are left out
+        (the last point is always labelled) """
+        points = [i for i, label in enumerate(labels) if label is not None]
+        if not skip_overlapping or len(points) < 2:
+            return points
+        left, top, right, bottom = bm.gfx.font.getbbox(max((labels[i] for i in points), key=len))
+        label_w = right - left
+        kept = []
+        for i in points[:-1]:
+            if not kept or xs[i] - xs[kept[-1]] >= label_w:
+                kept.append(i)
+        last = points[-1]
+        while kept and xs[last] - xs[kept[-1]] < label_w:
+            kept.pop()
+        kept.append(last)
+        return kept
+
     def _render_lines(self, bm: PMBitmap, x, y, ly, trace):
             x_data = self.x_axis.data
             y_data = trace.data
-            line_width = trace.line_width
-            label_format = trace.label_format
-            for i in range(len(y_data) - 1):
-                point = y_data[i]
-                x0, y0 = self._to_float(x_data[i]), self._to_float(point.y)
-                y0 *= trace.scale or 1.0
-                next_point = y_data[i + 1]
-                x1, y1 = self._to_float(x_data[i + 1]), self._to_float(next_point.y)
-                if y1 is not None:
-                    y1 *= trace.scale or 1.0
-                # Print y-value at each point
-                if y0 is None:
-                    continue
-                bm.gfx.text_color = point.color or trace.color
-                rect = (x + self._sx(x0), ly - self._sy(y0), x + self._sx(x0), ly - self._sy(y0))
-                if label_format:
-                    bm.text_box(rect, label_format.format(y0))
-                if y1 is None:
-                    continue # skip if data is missing
-                line = (x + self._sx(x0), y - self._sy(y0), x + self._sx(x1), y - self._sy(y1))
-                bm.line(line, color=point.color or trace.color, width=line_width)
-
-            # Print last y-value
-            last_point = y_data[-1]
-            if last_point is None:
+            n = len(y_data)
+            if not n:
                 return
-            bm.gfx.text_color = last_point.color or trace.color
-            sx0 = self._sx(x_data[-1])
-            sy0 = self._sy(last_point.y)
-            if sy0 is None or sx0 is None:
+            scale = trace.scale or 1.0
+            values = [None if point.y is None else self._to_float(point.y) * scale for point in y_data]
+            xs = self._scaled([x_data[i] if point.x is None else point.x for i, point in enumerate(y_data)], self.x_axis, x, 1)
+            ys = self._scaled(values, self.y_axis, 0, 1)
+
+            ## each run of points with data (and the same color) is one polyline
+            run, run_color = [], None
+            for i in range(n):
+                color = y_data[i].color or trace.color
+                if ys[i] is None or xs[i] is None:
+                    if len(run) > 2:
+                        bm.line(run, color=run_color, width=trace.line_width)
+                    run = []
+                    continue
+                if run and color != run_color:
+                    ## the segment into this point has the previous point's color
+                    run += [xs[i], y - ys[i]]
+                    bm.line(run, color=run_color, width=trace.line_width)
+                    run = []
+                if not run:
+                    run_color = color
+                run += [xs[i], y - ys[i]]
+            if len(run) > 2:
+                bm.line(run, color=run_color, width=trace.line_width)
+
+            # Print the y-values
+            label_format = trace.label_format
+            if not label_format:
                 return
-            rect =(x + sx0, ly - sy0, x + sx0, ly - sy0)
-            if label_format:
-                bm.text_box(rect, label_format.format(last_point.y))
+            labels = [None if ys[i] is None or xs[i] is None else label_format.format(values[i]) for i in range(n)]
+            for i in self._label_points(bm, xs, labels, trace.skip_overlapping_labels):
+                bm.gfx.text_color = y_data[i].color or trace.color
+                rect = (xs[i], ly - ys[i], xs[i], ly - ys[i])
+                bm.text_box(rect, labels[i])
 
     def _render_bars(self, bm: PMBitmap, x, y, label_y, trace):                
             x_data = self.x_axis.data
@@ -223,7 +330,7 @@ class PMPlotComponent(PMComponent):
                 bar_width = point.width or trace.width
                 if point._width is not None:
                     bar_width = self._sx(self.x_axis.min.timestamp() + point._width)
-                x0, y0 = self._to_float(x_data[i]), self._to_float(point.y)
+                x0, y0 = self._to_float(x_data[i] if point.x is None else point.x), self._to_float(point.y)
                 # Print y-value at each point
                 if y0 is None:
                     continue
@@ -293,11 +400,24 @@ class PMPlotComponent(PMComponent):
             bm.text(self.y_axis.title, 0, (self.rect.height - w)/2, angle=-90)
         bm.gfx_pop()
 
-    def render(self, bm: PMBitmap) -> None:
-        bm.gfx_push(self.gfx)
+    def _axes_key(self, bm: PMBitmap):
+        ## everything the background, title and axes depend on (but not the x data)
+        axes = tuple(tuple(getattr(axis, f.name) for f in fields(axis) if f.name != "data") for axis in (self.x_axis, self.y_axis))
+        return (axes, self._plot.title, self.rect.width, self.rect.height, bm.width, bm.height)
+
+    def _render_axes(self, bm: PMBitmap):
         bm.rectangle((0, 0, self.rect.width, self.rect.height), fill="white")
         self._render_title(bm)
         self._render_axis(bm, self.x_axis, dx=1, dy=0)
         self._render_axis(bm, self.y_axis, dx=0, dy=1)
+
+    def render(self, bm: PMBitmap, static_layer=None) -> None:
+        """ static_layer: the tile's PMTile.static_layer, so the background, title and axes
+        are only drawn again when the axis config changes """
+        bm.gfx_push(self.gfx)
+        if static_layer:
+            static_layer(lambda: self._render_axes(bm), self._axes_key(bm))
+        else:
+            self._render_axes(bm)
         self._render_traces(bm)
         bm.gfx_pop()
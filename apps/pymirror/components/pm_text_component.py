@@ -29,15 +29,27 @@ class PMTextComponent(PMComponent):
         self._hoffset = 0
         self._dx = -10
         self._last_text = None
+        self._bitmap: PMBitmap = None ## the rendered text, redrawn only when it changes
 
-    def render(self, bitmap: PMBitmap) -> None:
-        if not self.text:
-            return
+    def _draw(self) -> None:
+        width, height = self.rect.width, self.rect.height
+        if self._bitmap is None or (self._bitmap.width, self._bitmap.height) != (width, height):
+            self._bitmap = PMBitmap(width, height)
+        bitmap = self._bitmap
         gfx = bitmap.gfx_push(self.gfx)
-        gfx.merge(self._comp)
-        lines = gfx.font.text_split(self.text, self.rect, self.wrap)
-        bitmap.text_box(self.rect, lines, valign=self.valign, halign=self.halign, clip=self.clip, use_baseline=self.use_baseline)
+        bitmap.clear()
+        if self.text:
+            gfx.merge(self._comp)
+            rect = PMRect(0, 0, width - 1, height - 1)
+            lines = gfx.font.text_split(self.text, rect, self.wrap)
+            bitmap.text_box(rect, lines, valign=self.valign, halign=self.halign, clip=self.clip, use_baseline=self.use_baseline)
         bitmap.gfx_pop()
+
+    def render(self, bitmap: PMBitmap, force: bool = False) -> None:
+        """Paste the text into bitmap at self.rect (replacing what was there); it's only re-drawn if it changed"""
+        if force or self._bitmap is None or self.is_dirty():
+            self._draw()
+        bitmap.paste(self._bitmap, self.rect.x0, self.rect.y0)
         self.clean()
 
     def update(self, text: str = None) -> None:
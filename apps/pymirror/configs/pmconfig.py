@@ -1,9 +1,14 @@
-from dataclasses import fields as dc_fields
+from dataclasses import fields as dc_fields, is_dataclass
+import hashlib
 import importlib
+import pickle
+import re
+import sys
 from typing import get_type_hints
 import os
 
 from glslib.gson import json_dumps, json_loads, json_read
+from glslib.module_manager import TileManager
 from glslib.to_types import to_dict
 from glslib.strings import pascal_to_snake, snake_to_pascal
 from glslib.logger import trace, trace_method, _trace, _info, _print, _warning
@@ -14,6 +19,47 @@ class Object:
     def __init__(self):
         pass
 
+## env var references in a config file: $NAME, ${NAME} and names used inside {{ }}
+_env_ref_re = re.compile(r"\$\{?([A-Za-z_]\w*)")
+_jinja_expr_re = re.compile(r"\{\{(.*?)\}\}", re.S)
+_name_re = re.compile(r"[A-Za-z_]\w*")
+
+def _env_names(text: str) -> list[str]:
+    names = set(_env_ref_re.findall(text))
+    for expr in _jinja_expr_re.findall(text):
+        names.update(_name_re.findall(expr))
+    return sorted(names)
+
+def _env_hash(names: list[str]) -> str:
+    ## a hash (not the values) of the env vars a config file expands
+    return hashlib.sha256(repr([(name, os.environ.get(name)) for name in names]).encode()).hexdigest()
+
+def _file_stat(path: str):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _class_files(obj, files: set, seen: set):
+    ## the source files of every config class in a resolved config tree
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, dict):
+        values = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        values = obj
+    elif is_dataclass(obj) or hasattr(obj, "__dict__"):
+        module = sys.modules.get(type(obj).__module__)
+        if getattr(module, "__file__", None):
+            files.add(module.__file__)
+        values = vars(obj).values()
+    else:
+        return
+    for value in values:
+        _class_files(value, files, seen)
+
 @trace
 class PMConfig:
     """
@@ -24,8 +70,89 @@ class PMConfig:
     The configs are defined in the current package
     And they are expected to include default values.
     """
-    def __init__(self):
-        pass
+    def __init__(self, cache_file: str = None):
+        ## compiled config cache: the resolved config tree of each file, pickled,
+        ## keyed by the file (and config class and pmconfig.py source files) mtimes plus the env vars it expands
+        self.cache_file = os.path.expandvars(cache_file) if cache_file else None
+        self.secret_names = set() ## files that expand any of these are never cached
+        self._cache = None
+        self._cache_dirty = False
+
+    def _cache_load(self):
+        if self._cache is not None:
+            return self._cache
+        self._cache = {}
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "rb") as file:
+                    self._cache = pickle.load(file)
+            except Exception as e:
+                _warning("... config cache unreadable, ignoring:", e)
+        return self._cache
+
+    def _cache_get(self, fname: str, with_config: str):
+        if not self.cache_file:
+            return None
+        entry = self._cache_load().get((os.path.abspath(fname), with_config))
+        if not entry:
+            return None
+        if _file_stat(fname) != entry["stat"] or _env_hash(entry["names"]) != entry["env"]:
+            return None
+        for path, stat in entry["deps"]:
+            if _file_stat(path) != stat:
+                return None
+        try:
+            return pickle.loads(entry["data"])
+        except Exception as e:
+            _warning("... config cache entry unreadable:", fname, e)
+            return None
+
+    def _cache_put(self, fname: str, with_config: str, stat, text: str, obj):
+        if not self.cache_file:
+            return
+        names = _env_names(text)
+        if "{%" in text or self.secret_names.intersection(names):
+            _info("... not caching", fname)
+            return
+        files = {__file__} ## a change to the loader itself invalidates the cache too
+        _class_files(obj, files, set())
+        try:
+            data = pickle.dumps(obj)
+        except Exception as e:
+            _info("... can't cache", fname, e)
+            return
+        self._cache_load()[(os.path.abspath(fname), with_config)] = dict(
+            stat=stat,
+            names=names,
+            env=_env_hash(names),
+            deps=[(path, _file_stat(path)) for path in sorted(files)],
+            data=data,
+        )
+        self._cache_dirty = True
+
+    def peek(self, fname: str, key: str):
+        """One top-level value of a config file, without resolving it
+        (kept in the cache while the file is unchanged, so a warm boot doesn't parse the file for it)"""
+        stat = _file_stat(fname)
+        cache_key = ("peek", os.path.abspath(fname), key)
+        entry = self._cache_load().get(cache_key) if self.cache_file else None
+        if entry and entry["stat"] == stat:
+            return entry["value"]
+        value = json_read(fname).get(key)
+        if self.cache_file:
+            self._cache_load()[cache_key] = dict(stat=stat, value=value)
+            self._cache_dirty = True
+        return value
+
+    def save_cache(self):
+        if not (self.cache_file and self._cache_dirty):
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        tmp_file = self.cache_file + ".tmp"
+        with open(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as file:
+            pickle.dump(self._cache, file)
+        os.replace(tmp_file, self.cache_file)
+        self._cache_dirty = False
 
     def _handle_strict_types(self, clazz, obj: any):
         """Validate and convert types after initialization"""
@@ -145,7 +272,7 @@ class PMConfig:
         tile_name = f"tiles.{_tile_name}_tile"
         clazz_name = f"{config_name}Config"
         print(f"147 Loading tile class '{clazz_name}' from module '{tile_name}'...")
-        tile = importlib.import_module(tile_name)
+        tile = TileManager.import_module(tile_name)
         clazz = getattr(tile, clazz_name, None) # get the class from the tile
         _print(f"... loaded class: {clazz}")
         return clazz
@@ -189,11 +316,19 @@ class PMConfig:
 
     def from_file(self, fname: str, with_config:str=None) -> "PMConfig":
         # try:
-            obj = json_read(fname)
+            result = self._cache_get(fname, with_config)
+            if result is not None:
+                return result
+            stat = _file_stat(fname)
+            with open(fname, "r") as file:
+                text = file.read()
+            obj = json_loads(text)
             expand_dict(obj, os.environ)
             self._rename_class_to_clazz(obj)
             _print("with_config", with_config)
-            return self.from_dict(obj, with_config=with_config)
+            result = self.from_dict(obj, with_config=with_config)
+            self._cache_put(fname, with_config, stat, text, result)
+            return result
         # except Exception as e:
         #     raise TypeError(f"error reading file '{fname}. {str(e)}")
 
@@ -13,3 +13,5 @@ class PymirrorConfig:
     positions: dict = field(default_factory=dict)
     tiles: list = field(default_factory=list)
     imports: list = field(default_factory=list)
+    init_workers: int = 4 ## tile constructors run on this many threads (0: one at a time, before the first frame)
+    events: dict = field(default_factory=dict) ## event name -> coalescing/priority policy overrides (see PMEventBus)
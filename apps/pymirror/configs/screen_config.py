@@ -11,4 +11,5 @@ class ScreenConfig(FontMixin, GfxMixin, TextMixin):
     height: int = 1080
     rotate: int = 0  # Rotation angle in degrees
     output_file: str = None
-    frame_buffer: str = None # Path to framebuffer device
\ No newline at end of file
+    frame_buffer: str = None # Path to framebuffer device
+    stream_fps: float = 2.0 # Max frames per second sent to /stream.mjpg viewers
\ No newline at end of file
@@ -0,0 +1,7 @@
+from dataclasses import dataclass
+
+@dataclass
+class DataChangedEvent:
+	event: str = "DataChangedEvent"
+	name: str = ""
+	version: int = 0
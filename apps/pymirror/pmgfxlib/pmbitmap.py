@@ -269,11 +269,38 @@ class PMBitmap:
             text_y0 += font_height + baseline
         return (x0, text_y0)
 
-    def paste(self, src: "PMBitmap", x0=None, y0=None, mask: "PMBitmap" = None) -> None:
+    def save_layer(self) -> Image.Image:
+        """A copy of the bitmap's pixels, for restore_layer()"""
+        return self._img.copy()
+
+    def restore_layer(self, layer: Image.Image) -> None:
+        """Replace the bitmap's pixels with a saved layer (a straight copy, no blending)"""
+        self._img.paste(layer, (0, 0))
+
+    def is_opaque(self, box: tuple = None) -> bool:
+        """True if every pixel (in box: x0, y0, x1, y1 inclusive, if given) has alpha 255 (so it can be pasted without a mask)"""
+        img = self._img
+        if img.mode != "RGBA":
+            return True
+        if box:
+            img = img.crop((box[0], box[1], box[2] + 1, box[3] + 1))
+        ## transparent bitmaps almost always show it in a corner, which is much cheaper to check than every pixel
+        w, h = img.width - 1, img.height - 1
+        if any(img.getpixel(xy)[3] != 255 for xy in ((0, 0), (w, 0), (0, h), (w, h))):
+            return False
+        return img.getchannel("A").getextrema()[0] == 255
+
+    def paste(self, src: "PMBitmap", x0=None, y0=None, mask: "PMBitmap" = None, box: tuple = None) -> None:
+        """box (x0, y0, x1, y1, inclusive, in src's pixels) pastes just that part of src, at the same offset from x0, y0"""
         if x0 == None:
             x0 = src.rect.x0
         if y0 == None:
             y0 = src.rect.y0
+        if box:
+            bx0, by0, bx1, by1 = box
+            img = src._img.crop((bx0, by0, bx1 + 1, by1 + 1))
+            self._img.paste(img, (x0 + bx0, y0 + by0), mask and mask._img.crop((bx0, by0, bx1 + 1, by1 + 1)))
+            return
         self._img.paste(src._img, (x0, y0), mask and mask._img)
 
     def scale_to_fit(self, target_width, target_height):
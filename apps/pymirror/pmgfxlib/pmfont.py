@@ -4,6 +4,7 @@ from typing import ClassVar, Optional
 from PIL import ImageFont
 from glslib.rects import _height, _width
 from glslib.logger import trace, _debug
+from glslib.timeline import timeline
 
 @dataclass
 class PMFont:
@@ -21,7 +22,8 @@ class PMFont:
     def __post_init__(self):
         if not PMFont.FONT_LIST:
             PMFont.FONT_LIST = []
-            PMFont.FONT_LIST = self._read_fontlist()
+            with timeline.span("read fontlist"):
+                PMFont.FONT_LIST = self._read_fontlist()
         self.set_font(self._name, self._pitch)
 
     def copy(self) -> "PMFont":
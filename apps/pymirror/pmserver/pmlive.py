@@ -0,0 +1,58 @@
+import itertools
+import json
+import queue
+import threading
+import time
+
+class PMLiveChannel:
+    """
+    Server-Sent Events fan-out for GET /live.
+    Each connected client gets its own bounded queue; publish() never blocks the render loop
+    (a client that falls behind loses its oldest messages).
+    """
+    def __init__(self, max_backlog: int = 64, heartbeat: float = 15.0):
+        self.max_backlog = max_backlog
+        self.heartbeat = heartbeat
+        self._clients = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def has_clients(self) -> bool:
+        return bool(self._clients)
+
+    def publish(self, kind: str, data: dict):
+        if not self._clients:
+            return
+        message = f"event: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                ## drop the oldest message to make room
+                try:
+                    client.get_nowait()
+                    client.put_nowait(message)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stream(self):
+        """A generator of SSE messages for one client (ends when the client goes away)"""
+        client = queue.Queue(self.max_backlog)
+        with self._lock:
+            self._clients.append(client)
+        try:
+            yield f"retry: 2000\nevent: hello\ndata: {json.dumps({'time': time.time()})}\n\n"
+            while True:
+                try:
+                    yield client.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    ## keeps proxies from closing an idle connection (and notices dead clients)
+                    yield ": heartbeat\n\n"
+        finally:
+            with self._lock:
+                self._clients.remove(client)
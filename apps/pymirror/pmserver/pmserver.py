@@ -1,8 +1,10 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from threading import Thread
 import logging
 
 from glslib.gson import json_loads
+from pmserver.pmlive import PMLiveChannel
+from pmserver.pmstream import BOUNDARY, PMFrameStreamer
 
 class PMServer:
     def __init__(self, config, event_queue, host="0.0.0.0", port=8080):
@@ -23,8 +25,24 @@ class PMServer:
         self.host = host
         self.port = port
         self.config = config
+        self.live = PMLiveChannel()  # push channel for remote dashboards (GET /live)
+        self.stream = PMFrameStreamer(config.screen.stream_fps)  # remote view (GET /stream.mjpg)
         self._setup_routes()
 
+    def _queue_event(self, data):
+        """ Queue one event (a dict or a json string); returns the queued event, with its event_id """
+        if type(data) == str:
+            data = json_loads(data.strip())
+        if not isinstance(data, dict):
+            raise ValueError(f"event must be an object, got {type(data).__name__}")
+        data["event_id"] = self.live.next_id()
+        self.queue.put(data)
+        return data
+
+    def notify(self, kind: str, data: dict):
+        """ Push a message to every client on /live (no-op when nobody is listening) """
+        self.live.publish(kind, data)
+
     def _setup_routes(self):
         @self.app.route("/")
         def index():
@@ -44,15 +62,42 @@ class PMServer:
             if not data:
                 return jsonify({"error": "Missing 'action'"}), 400
             print("data: ", type(data))
-            if type(data) == str:
+            try:
+                data = self._queue_event(data)
+            except Exception:
+                msg = f"ERROR: problem converting '{data}' to json"
+                print(msg)
+                return jsonify({"status": "error", "msg": msg})
+            return jsonify({"status": "queued", "action": data, "event_id": data["event_id"]})
+
+        @self.app.route("/events", methods=["POST"])
+        def events():
+            ## a batch of events: [{...}, {...}] or {"events": [...]}
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get("events")
+            if not isinstance(data, list):
+                return jsonify({"status": "error", "msg": "expected a list of events"}), 400
+            results = []
+            for item in data:
                 try:
-                    data = json_loads(data.strip())
-                except:
-                    msg = f"ERROR: problem converting '{data}' to json"
-                    print(msg)
-                    return jsonify({"status": "error", "msg": msg})
-            self.queue.put(data)
-            return jsonify({"status": "queued", "action": data})
+                    results.append({"status": "queued", "event_id": self._queue_event(item)["event_id"]})
+                except Exception as e:
+                    results.append({"status": "error", "msg": str(e)})
+            return jsonify({"status": "queued", "results": results})
+
+        @self.app.route("/stream.mjpg")
+        def stream():
+            ## ?delta=1: only the changed region of each frame (see PMFrameStreamer)
+            delta = request.args.get("delta") in ["1", "true", "on"]
+            headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            return Response(self.stream.stream(delta), mimetype=f"multipart/x-mixed-replace; boundary={BOUNDARY}", headers=headers)
+
+        @self.app.route("/live")
+        def live():
+            ## Server-Sent Events: "frame", "ack" and "metrics" messages
+            headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            return Response(stream_with_context(self.live.stream()), mimetype="text/event-stream", headers=headers)
 
     def start(self):
         def run():
@@ -0,0 +1,125 @@
+import io
+import queue
+import threading
+import time
+
+from PIL import Image
+
+from glslib.logger import _debug
+
+BOUNDARY = "pmframe"
+
+class PMFrameStreamer:
+    """
+    MJPEG stream of the screen for GET /stream.mjpg.
+    Frames are only taken (and JPEG-encoded, on the encoder thread) while a client is attached,
+    and at most fps times a second.
+    "delta" clients get only the part of the screen that changed since their last frame,
+    with its position in an X-Region header (x0,y0,x1,y1).
+    """
+    def __init__(self, fps: float = 2.0, quality: int = 75):
+        self.fps = fps
+        self.quality = quality
+        self._clients = []  # (queue, delta)
+        self._lock = threading.Lock()
+        self._frame = threading.Condition()
+        self._pending = None  # ([(region, bbox)...], bbox of them all, screen size) waiting for the encoder
+        self._canvas = None  # the encoder's RGB copy of the screen (only touched on the encoder thread)
+        self._last_offer = 0.0
+        self._need_full = False
+        self._thread = None
+
+    def has_clients(self) -> bool:
+        return bool(self._clients)
+
+    def wants_frame(self) -> bool:
+        """True when a client is attached and the next frame is due"""
+        return bool(self._clients) and time.monotonic() - self._last_offer >= 1.0 / self.fps
+
+    def need_full(self) -> bool:
+        """True when a client has just attached and hasn't had a whole frame yet"""
+        return self._need_full
+
+    def offer(self, region, bbox, size):
+        """Hand over the part of the screen that changed (region: a copy of just that part, at bbox)
+        and the screen's size; it's converted, merged into the frame and encoded off the main thread"""
+        self._last_offer = time.monotonic()
+        self._need_full = False
+        with self._frame:
+            regions = [(region, bbox)]
+            if self._pending:
+                ## the encoder hasn't caught up: keep both regions (in order) and merge their bboxes
+                x0, y0, x1, y1 = self._pending[1]
+                regions = self._pending[0] + regions
+                bbox = (min(x0, bbox[0]), min(y0, bbox[1]), max(x1, bbox[2]), max(y1, bbox[3]))
+            self._pending = (regions, bbox, size)
+            self._frame.notify()
+
+    def _encode(self, img) -> bytes:
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=self.quality)
+        return buf.getvalue()
+
+    def _part(self, jpeg: bytes, bbox=None) -> bytes:
+        headers = f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n"
+        if bbox:
+            headers += "X-Region: " + ",".join(str(v) for v in bbox) + "\r\n"
+        return headers.encode() + b"\r\n" + jpeg + b"\r\n"
+
+    def _run(self):
+        while True:
+            with self._frame:
+                while not self._pending:
+                    self._frame.wait()
+                regions, bbox, size = self._pending
+                self._pending = None
+            if self._canvas is None or self._canvas.size != size:
+                self._canvas = Image.new("RGB", size)
+            for region, (x0, y0, _, _) in regions:
+                self._canvas.paste(region.convert("RGB"), (x0, y0))
+            img = self._canvas
+            with self._lock:
+                clients = list(self._clients)
+            full = delta = None
+            t0 = time.time()
+            for client, wants_delta in clients:
+                if wants_delta and client.had_frame:
+                    if delta is None:
+                        ## bbox is inclusive; PIL crops are exclusive on the right/bottom
+                        delta = self._part(self._encode(img.crop((bbox[0], bbox[1], bbox[2] + 1, bbox[3] + 1))), bbox)
+                    part = delta
+                else:
+                    if full is None:
+                        full = self._encode(img)
+                    part = self._part(full, (0, 0, img.width - 1, img.height - 1) if wants_delta else None)
+                try:
+                    client.put_nowait(part)
+                    client.had_frame = True
+                except queue.Full:
+                    ## a slow client skips frames (and gets a whole one next)
+                    client.had_frame = False
+            _debug(f"PMFrameStreamer: encoded for {len(clients)} clients in {(time.time() - t0) * 1000:.1f} ms")
+
+    def stream(self, delta: bool = False):
+        """A generator of multipart/x-mixed-replace parts for one client"""
+        client = queue.Queue(2)
+        client.had_frame = False
+        with self._lock:
+            self._clients.append((client, delta))
+            self._need_full = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="PMFrameStreamer", daemon=True)
+                self._thread.start()
+        part = None
+        try:
+            while True:
+                try:
+                    part = client.get(timeout=10)
+                except queue.Empty:
+                    ## nothing changed: resend the last frame so a dead connection is noticed
+                    if part is None or delta:
+                        continue
+                yield part
+        finally:
+            with self._lock:
+                self._clients.remove((client, delta))
@@ -25,6 +25,7 @@ class PMCard(PMTile):
         self._header = self._make_header()
         self._footer = self._make_footer()
         self._body = self._make_body()
+        self._rendered_focus = None ## the focus state last drawn (None: never rendered)
 
     def _make_header(self):
         width = self.bitmap.width
@@ -35,7 +36,7 @@ class PMCard(PMTile):
         footer_height = non_null(self._card.footer.height, self.bitmap.gfx.font.height, 1)
         y0 = self.bitmap.height - footer_height
         width = self.bitmap.width
-        return PMTextComponent(self.bitmap.gfx, self._card.footer, y0=y0, width=width)
+        return PMTextComponent(self.bitmap.gfx, self._card.footer, y0=y0, width=width, height=footer_height)
 
     def _make_body(self):
         y0 = self._header.height
@@ -74,13 +75,24 @@ class PMCard(PMTile):
         return dirty
 
     def render(self, force: bool = False) -> bool:
-        self.bitmap.clear()
-        self._header.render(self.bitmap)
-        self._body.render(self.bitmap)
-        self._footer.render(self.bitmap)
+        ## each component keeps its own bitmap; only the ones that changed are redrawn and pasted
+        ## (the whole card is redrawn when forced or when the focus changes)
+        full = force or self._rendered_focus != self.focus
+        if full:
+            self.bitmap.clear()
+        damage = []  # one box per component (so a changed header and footer don't drag the body along)
+        for component in (self._header, self._body, self._footer):
+            if not (full or component.is_dirty()):
+                continue
+            component.render(self.bitmap, force)
+            x0, y0 = max(component.rect.x0, 0), max(component.rect.y0, 0)
+            x1, y1 = min(component.rect.x1, self.bitmap.width - 1), min(component.rect.y1, self.bitmap.height - 1)
+            damage.append((x0, y0, x1, y1))
         self.render_focus()
+        self._rendered_focus = self.focus
         self.clean()
-        return True
+        self.damage = None if full else damage
+        return bool(full or damage)
 
     def exec(self) -> bool:
         is_dirty = self.is_dirty()
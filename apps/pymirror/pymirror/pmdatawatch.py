@@ -0,0 +1,36 @@
+from glslib.glsdb import GLSDb
+from glslib.logger import _debug
+
+class PMDataWatch:
+    """
+    Tracks the version pmtaskmgr keeps for one named data set (see DataVersionTable).
+    The version is learned from a DataChangedEvent or by polling the (one row) version table,
+    so a tile only re-reads and re-parses its payload when the data has actually changed.
+    """
+    def __init__(self, pmdb: GLSDb, name: str):
+        self.pmdb = pmdb
+        self.name = name
+        self.version = None ## version last consumed by the tile
+        self.latest = None  ## latest version known
+
+    def on_event(self, event) -> bool:
+        ## returns True if the DataChangedEvent is for this data set
+        if event.name != self.name:
+            return False
+        self.latest = event.version
+        return True
+
+    def poll(self):
+        try:
+            rows = self.pmdb.query("SELECT version FROM data_version WHERE name = :name", {"name": self.name})
+            self.latest = rows[0]["version"] if rows else None
+        except Exception as e:
+            ## an older pmtaskmgr doesn't keep versions... treat every poll as a change
+            _debug("PMDataWatch.poll failed:", e)
+            self.latest = None
+
+    def is_changed(self) -> bool:
+        return self.latest is None or self.latest != self.version
+
+    def consume(self):
+        self.version = self.latest
@@ -0,0 +1,197 @@
+from collections import defaultdict, deque
+from dataclasses import dataclass
+import threading
+import time
+
+from munch import DefaultMunch, Munch
+from glslib.logger import _debug, _warning
+
+## lanes, highest priority first
+INPUT, CONTROL, DATA = 0, 1, 2
+LANES = {"input": INPUT, "control": CONTROL, "data": DATA}
+
+@dataclass
+class EventPolicy:
+    lane: int = DATA
+    coalesce: str = None  # None | "latest" | "merge" | "window"
+    key: tuple = ("event", "tile")  # fields that make two events "the same" (("*",): all of them but event_id)
+    window_ms: int = 0  # "window": drop a repeat of the same event published within window_ms
+    only_if: str = None  # only coalesce events with this field set (eg: "repeat")
+
+## latest: a queued event is replaced by a newer one (it keeps its place in the queue)
+## merge: a newer event's fields are merged into the queued one
+## window: a repeat of the same event within window_ms of the last one is dropped
+DEFAULT_POLICIES = {
+    "RawKeyboardEvent": EventPolicy(INPUT, "window", ("event", "scancode", "key_name", "pressed"), 100, "repeat"),
+    "KeyboardEvent": EventPolicy(INPUT),
+    ## never merged or replaced: control.html posts every flag, so a later post's false would cancel an earlier restart/reboot/purge;
+    ## only an identical repeat (eg: a burst of refresh posts) is dropped
+    "PyMirrorEvent": EventPolicy(CONTROL, "window", ("*",), 250),
+    "WeatherForecastEvent": EventPolicy(DATA, "latest"),
+    "WeatherAlertEvent": EventPolicy(DATA, "latest"),
+    "DataChangedEvent": EventPolicy(DATA, "latest", ("event", "name")),
+}
+
+class PMEvent(dict):
+    """
+    An event: a plain dict whose keys can also be read (and set) as attributes, None if missing.
+    Only nested dicts and lists are munchified, so a flat event (keys, data changes...) costs one dict copy.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PMEvent":
+        return cls({k: DefaultMunch.fromDict(v) if isinstance(v, (dict, list)) else v for k, v in d.items()})
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)  # copy, pickle, ... look for these
+        return self.get(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        self.pop(name, None)
+
+def make_policy(config: dict) -> EventPolicy:
+    """An EventPolicy from a config entry like {"lane": "input", "coalesce": "latest", "key": ["event", "name"]}"""
+    policy = EventPolicy(**{k: v for k, v in config.items() if k in EventPolicy.__dataclass_fields__})
+    if isinstance(policy.lane, str):
+        policy.lane = LANES[policy.lane]
+    policy.key = tuple(policy.key)
+    return policy
+
+class PMEventBus:
+    """
+    Delivers events to the tiles subscribed to them.
+    Subscribers are indexed by event name (and tile name, for events aimed at one tile),
+    and events published while dispatching are delivered in the same dispatch,
+    up to max_depth rounds (anything left over waits for the next frame).
+    Events wait in priority lanes (input before control before data) and may be
+    coalesced as they are published, according to their EventPolicy.
+    At most max_events control/data events are delivered per dispatch; input is never held back.
+    publish() may be called from any thread.
+    """
+    def __init__(self, max_depth: int = 8, max_events: int = 64, policies: dict = None):
+        self.max_depth = max_depth
+        self.max_events = max_events
+        self.policies = dict(DEFAULT_POLICIES)
+        for name, config in (policies or {}).items():
+            self.policies[name] = make_policy(config)
+        self._default_policy = EventPolicy()
+        self._lanes = [deque() for _ in LANES]  # of [event] cells, so a queued event can be replaced in place
+        self._queued = {}  # coalescing key -> queued cell
+        self._last_seen = {}  # coalescing key -> time of the last "window" event let through
+        self._lock = threading.Lock()
+        self._tiles = []
+        self._index = None  # event name -> [tiles], rebuilt lazily
+        self.coalesced = 0
+
+    def set_tiles(self, tiles: list):
+        self._tiles = tiles
+        self._index = None
+
+    def invalidate(self):
+        ## a tile's subscriptions changed
+        self._index = None
+
+    def _build_index(self):
+        index = defaultdict(list)
+        for tile in self._tiles:
+            for event_name in dict.fromkeys(tile.subscriptions or []):
+                index[event_name].append(tile)
+        self._index = index
+        return index
+
+    def publish(self, event):
+        ## events are converted once, here, rather than on every delivery
+        if isinstance(event, dict) and not isinstance(event, (PMEvent, Munch)):
+            event = PMEvent.from_dict(event)
+        policy = self.policies.get(getattr(event, "event", None), self._default_policy)
+        with self._lock:
+            if policy.coalesce and (not policy.only_if or getattr(event, policy.only_if, None)):
+                if self._coalesce(event, policy):
+                    self.coalesced += 1
+                    return
+            cell = [event]
+            if policy.coalesce in ("latest", "merge"):
+                self._queued[self._key(event, policy)] = cell
+            self._lanes[policy.lane].append(cell)
+
+    def _key(self, event, policy: EventPolicy) -> tuple:
+        if policy.key == ("*",):
+            ## the whole payload (the server numbers every post, so event_id is left out)
+            return tuple(sorted((field, repr(value)) for field, value in event.items() if field != "event_id"))
+        return tuple(getattr(event, field, None) for field in policy.key)
+
+    def _coalesce(self, event, policy: EventPolicy) -> bool:
+        """True if event was folded into (or dropped in favour of) an earlier one"""
+        key = self._key(event, policy)
+        if policy.coalesce == "window":
+            now = time.monotonic()
+            last = self._last_seen.get(key)
+            if last is not None and (now - last) * 1000 < policy.window_ms:
+                return True
+            self._last_seen[key] = now
+            return False
+        cell = self._queued.get(key)
+        if cell is None:
+            return False
+        if policy.coalesce == "latest":
+            cell[0] = event
+        elif policy.coalesce == "merge":
+            merged = PMEvent(cell[0])
+            merged.update(event)
+            cell[0] = merged
+        return True
+
+    def _pop(self, lane: int):
+        with self._lock:
+            cell = self._lanes[lane].popleft()
+            event = cell[0]
+            policy = self.policies.get(getattr(event, "event", None), self._default_policy)
+            if policy.coalesce in ("latest", "merge"):
+                key = self._key(event, policy)
+                if self._queued.get(key) is cell:
+                    del self._queued[key]
+        return event
+
+    def _deliver(self, event, index):
+        subscribers = index.get(event.event)
+        if not subscribers:
+            return
+        target = getattr(event, "tile", None)
+        for tile in subscribers:
+            if target and target != tile.name:
+                continue
+            _debug(f"PMEventBus: deliver to {tile.name} event:", event.event)
+            tile.onEvent(event)
+
+    def pending(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    def dispatch(self) -> int:
+        """Deliver queued events (and the events they cause); returns the number delivered"""
+        delivered = 0
+        budget = self.max_events
+        for _ in range(self.max_depth):
+            ## only this round's events; ones published by handlers go in the next round
+            counts = [len(lane) for lane in self._lanes]
+            if not counts[INPUT] and (not any(counts) or budget <= 0):
+                break
+            index = self._index if self._index is not None else self._build_index()
+            for lane, count in enumerate(counts):
+                if lane != INPUT:
+                    count = min(count, budget)
+                    budget -= count
+                for _ in range(count):
+                    event = self._pop(lane)
+                    if not getattr(event, "event", None):
+                        _warning("PMEventBus: event has no name:", event)
+                        continue
+                    self._deliver(event, index)
+                    delivered += 1
+        if pending := self.pending():
+            _debug(f"PMEventBus: {pending} events deferred to the next frame (max_depth={self.max_depth}, max_events={self.max_events})")
+        return delivered
@@ -0,0 +1,24 @@
+from pymirror.pmtile import PMTile
+from glslib.logger import _debug
+
+class PMPlaceholderTile(PMTile):
+    """
+    Stands in for a tile while its constructor runs on a worker thread (see PyMirror._load_tiles).
+    It only draws the tile's name, and takes no events.
+    """
+    def __init__(self, pm, config):
+        super().__init__(pm, config)
+        self.subscriptions = []
+        self.dirty = True
+
+    def render(self, force: bool = False) -> bool:
+        if not self.bitmap:
+            return False
+        self.bitmap.clear()
+        self.bitmap.text_box((0, 0, self.bitmap.width - 1, self.bitmap.height - 1), f"{self.name}\n(loading...)", valign="center", halign="center")
+        self.dirty = False
+        return True
+
+    def exec(self) -> bool:
+        _debug("placeholder", self.name, "dirty=", self.dirty)
+        return self.dirty
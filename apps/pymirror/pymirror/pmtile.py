@@ -6,7 +6,6 @@ from glslib.glsdb import GLSDb
 from pmgfxlib.pmbitmap import PMBitmap
 from pymirror.pmtimer import PMTimer
 from pymirror.pymirror import PyMirror
-from glslib.to_types import to_munch
 from glslib.logger import _trace, _debug
 from pymirror.pmrect import PMRect
 
@@ -29,6 +28,7 @@ class TileConfig(GfxMixin, FontMixin, TextMixin):
     debug: bool = False
     force: bool = False
     clear: bool = False ## clear the framebuffer before writing
+    opaque: bool = None ## the bitmap has no transparent pixels (None: check after each render)
     refresh_time:str = "60s"
 
 class PMTile(ABC):
@@ -52,6 +52,11 @@ class PMTile(ABC):
         self.subscriptions = []
         self.dirty = False
         self.focus = False
+        self.opaque = False ## pasted without a mask (see is_opaque)
+        self.occluded = False ## hidden under an opaque tile: not exec'd, rendered or pasted
+        self._static_layer = None ## see static_layer()
+        self._static_key = None
+        self.damage = None ## set by render(): a list of the (x0, y0, x1, y1) boxes of the bitmap that changed (None: all of it, []: nothing)
 
         self._time = 0.0  # time taken for tile execution
         self.bitmap = None
@@ -62,6 +67,29 @@ class PMTile(ABC):
             self.bitmap.gfx.set_font(_tiledef.font_name, _tiledef.font_size)
         self.subscribe(_tiledef.subscriptions or [])
 
+    def is_opaque(self, box: tuple = None) -> bool:
+        """ True if the bitmap (or the box part of it) has no transparent pixels (checked after each render unless the tile config says) """
+        if self._tiledef.opaque is not None:
+            return self._tiledef.opaque
+        return self.bitmap.is_opaque(box)
+
+    def static_layer(self, draw, key=None) -> None:
+        """ Put the tile's unchanging content (clock face, axes, grid lines...) on the bitmap.
+        draw() paints it onto the bitmap; it's called the first time and whenever key changes,
+        and the result is cached. Other times the cached layer is copied back, replacing everything.
+        Draw the changing content (hands, data...) on top afterwards.
+        """
+        if self._static_layer is None or self._static_key != key:
+            draw()
+            self._static_layer = self.bitmap.save_layer()
+            self._static_key = key
+        else:
+            self.bitmap.restore_layer(self._static_layer)
+
+    def invalidate_static_layer(self) -> None:
+        """ Redraw the static layer on the next static_layer() call """
+        self._static_layer = None
+
     def _gfx_push(self):
         gfx = self.bitmap.gfx_push()
         return self.bitmap, gfx
@@ -119,6 +147,7 @@ class PMTile(ABC):
         """ Render the tile on its bitmap.
         returns True if the bitmap was updated, and needs a flush() call.
         If force is True, the tile should always render, even if nothing changed.
+        It may set self.damage to the boxes of the bitmap it changed, so only those are pasted on the screen.
         """
         pass
 
@@ -141,6 +170,9 @@ class PMTile(ABC):
             event_names = [event_names]
         for event_name in event_names:
             self.subscriptions.append(event_name)
+        event_bus = getattr(self.pm, "event_bus", None)
+        if event_bus:
+            event_bus.invalidate()
 
     def take_focus(self, state=True):
         self.focus = state
@@ -175,4 +207,4 @@ class PMTile(ABC):
         """ Publish an event to the PM.
         This is used to notify the PM of an event that occurred in the tile.
         """
-        self.pm.publish_event(to_munch(event))
\ No newline at end of file
+        self.pm.publish_event(event)
\ No newline at end of file
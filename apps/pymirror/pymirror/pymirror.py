@@ -1,9 +1,15 @@
+import sys
+from glslib.timeline import timeline
+if __name__ == "__main__" and any(arg.startswith("--profile") for arg in sys.argv):
+    timeline.start() ## before the imports below, so they show up in the startup profile
+
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 import importlib
 import os
 import time
-from dotenv import load_dotenv
+from dotenv import dotenv_values, find_dotenv, load_dotenv
 import queue
 import argparse
 import traceback
@@ -14,13 +20,12 @@ from configs.pmconfig import PMConfig
 from glslib.logger import _debug, _print, _die
 from glslib.strftime import exemplar_date_time
 from pymirror.pmscreen import PMScreen
+from pymirror.pmeventbus import PMEventBus
 from glslib.module_manager import TileManager
 from glslib.strings import expand_dataclass, snake_to_pascal
-from glslib.to_types import to_munch
 from pmserver.pmserver import PMServer
 from glslib.glsdb import GLSDb
 from glslib.pstat import get_pstat_delta, get_pids_by_cli
-import tiles ## import all tiles so that they get registered with the tileManager
 
 from events import * # get all events 
 
@@ -32,6 +37,17 @@ class PMStatus:
     start_time: datetime = None
     taskmgr: DefaultMunch = field(default_factory=DefaultMunch)
     
+def _bbox(rect):
+    """ A PMRect as a pixel (x0, y0, x1, y1) tuple """
+    return (rect.x0, rect.y0, rect.x1, rect.y1)
+
+def _union(bbox, rect):
+    """ The bounding box (x0, y0, x1, y1) of bbox (or None) and rect (a PMRect or another bbox) """
+    x0, y0, x1, y1 = rect if isinstance(rect, tuple) else _bbox(rect)
+    if bbox:
+        x0, y0, x1, y1 = min(x0, bbox[0]), min(y0, bbox[1]), max(x1, bbox[2]), max(y1, bbox[3])
+    return (x0, y0, x1, y1)
+
 def _to_null(s):
     """ Convert a string to None if it is 'null' or 'None' """
     if s in ["null", "None"]:
@@ -44,31 +60,50 @@ class PyMirror:
         ## so that they can access it without having to pass it around
         ## and they "pluck out" the values they need
         _debug(f"args: {args}")
-        self.configurator = PMConfig()
-        self._config = self._load_config(config_fname)
+        self.configurator = PMConfig(cache_file=_to_null(args.config_cache))
+        self._profile_startup = args.profile_startup
+        with timeline.span("load config"):
+            self._config = self._load_config(config_fname)
         if args.output_file:
             self._config.screen.output_file = _to_null(args.output_file)
         if args.frame_buffer:
             self._config.screen.frame_buffer = _to_null(args.frame_buffer)
         _debug(f"Using config: {self._config}")
-        self._import_modules_from_config()
-        self.pmdb = GLSDb(self._config.pmdb.url) if self._config.pmdb else None
-        self.screen = PMScreen(self._config.screen)
+        with timeline.span("register extensions"):
+            self._import_modules_from_config()
+        with timeline.span("pmdb connect"):
+            self.pmdb = GLSDb(self._config.pmdb.url) if self._config.pmdb else None
+        with timeline.span("screen"):
+            self.screen = PMScreen(self._config.screen)
         self.force_render = False
         self.debug = self._config.debug
         self.tiles = []
-        self.events = []
+        self.event_bus = PMEventBus(policies=self._config.events)
         self.start_time = datetime.now()
         self.status = None
-        self.get_status()
+        with timeline.span("status"):
+            self.get_status()
         self._clear_screen = True  # Flag to clear the screen on each loop
         self.server_queue = queue.Queue()  # Use a queue to manage events
-        self._load_tiles()
-        self.server = PMServer(self._config, self.server_queue)
-        self.server.start()  # Start the server to handle incoming events
+        self.server = None
+        self._frame = 0  # frames written to the screen (see _frame_done)
+        self._metrics_time = 0.0
+        self.live_metrics_interval = 5.0  # seconds between "metrics" messages on /live
+        self._stream_dirty = None  # bbox changed since the last frame sent to /stream.mjpg
+        self._occlusion_key = None  # the tile state _update_occlusion() last saw
+        self._pending_tiles = {}  # tile_n -> Future of a tile being constructed
+        self._first_frame_done = False  # the startup profile waits for this and the pending tiles
+        with timeline.span("load tiles"):
+            self._load_tiles()
+        self.configurator.save_cache()
+        if not self._pending_tiles:
+            self._tiles_ready()
+        with timeline.span("server start"):
+            self.server = PMServer(self._config, self.server_queue)
+            self.server.start()  # Start the server to handle incoming events
 
     def _import_modules_from_config(self):
-        """ Import any tiles specified in the config file """
+        """ Register any tiles specified in the config file (they're imported when a config uses them) """
         for folder in self._config.imports:
             for package_name in ["configs", "tables", "tiles"]:
                 TileManager.load_modules(folder, package_name)
@@ -92,103 +127,128 @@ class PyMirror:
         pmconfig = self.configurator
         # read .env file if it exists
         load_dotenv()
-        # Load the main configuration file
-        config = pmconfig.from_file(config_fname, with_config="pymirror")
+        pmconfig.secret_names.update(dotenv_values(find_dotenv()))
         # Load secrets from .secrets file if specified
-        secrets_path = config.secrets
+        # (before the main config is loaded, so no file that uses one is expanded into the config cache)
+        secrets_path = pmconfig.peek(config_fname, "secrets")
         if secrets_path:
             secrets_path = os.path.expandvars(secrets_path)
         else:
             secrets_path = ".secrets"
         load_dotenv(dotenv_path=secrets_path)
+        if os.path.exists(secrets_path):
+            pmconfig.secret_names.update(dotenv_values(secrets_path))
+        # Load the main configuration file
+        config = pmconfig.from_file(config_fname, with_config="pymirror")
         # Expand environment variables in the config
         expand_dataclass(config, os.environ)
         return config
 
     def _load_tiles(self):
-        pmconfig = self.configurator
+        ## configs are read here; the (slow) tile imports and constructors run on a worker pool
+        ## while a placeholder holds each tile's place (see _swap_ready_tiles)
+        from pymirror.pmplaceholder import PMPlaceholderTile ## pmtile imports this module
+        pool = ThreadPoolExecutor(self._config.init_workers, thread_name_prefix="tile_init") if self._config.init_workers else None
         for tile_config in self._config.tiles:
-            ## load the tile dynamically
-            if type(tile_config) is str:
-                ## if tiledef is a string, it is the name of a tile config file
-                ## load the tile definition from the file
-                ## the file should be in JSON format
-                tile_config = pmconfig.from_file(tile_config)
-                expand_dataclass(tile_config, {})  # Expand environment variables in the config
-            ## import the tile using its name
-            ## all tiles should be in the "tiles" directory
-            clazz_name = tile_config.tile.clazz
-            try:
-                mod = importlib.import_module(f"tiles.{clazz_name}_tile")
-            except ModuleNotFoundError as e:
-                msg = f"Error importing tile 'tiles.{clazz_name}_tile': {e}"
-                raise ImportError(f"{msg}\nBe sure to add the tile to your __init__.py file in the tiles directory.")
-            ## get the class from inside the tile
-            ## convert the file name to class name inside the tile
-            ## by convention the filename is snake_case and the class name is PascalCase
-            clazz_name = snake_to_pascal(clazz_name)
-            _print(f"Loading '{tile_config.tile.name}' tile, class {clazz_name} from {mod.__name__}")
-            clazz = getattr(mod, clazz_name + "Tile", None)
-            if clazz is None:
-                raise ImportError(f"Class '{clazz_name}tile' not found in tile '{mod.__name__}'")
-
-            ## create an instance of the class (tile)
-            ## and pass the PyMirror instance and the tile config to it
-            ## See pymirror.PMtile for the expected constructor
-            obj = clazz(self, tile_config)
-
+            with timeline.span("tile", config=tile_config if type(tile_config) is str else ""):
+                tile_config = self._load_tile_config(tile_config)
+                if pool:
+                    self._pending_tiles[len(self.tiles)] = pool.submit(self._make_tile, tile_config)
+                    obj = PMPlaceholderTile(self, tile_config)
+                else:
+                    obj = self._make_tile(tile_config)
             ## update the tile with its position in the pm.tiles list
             obj.tile_n = len(self.tiles)
 
             ## add the tile to the list of tiles
             self.tiles.append(obj)
+        self.event_bus.set_tiles(self.tiles)
+        if pool:
+            pool.shutdown(wait=False)
+
+    def _swap_ready_tiles(self):
+        """ Replace placeholders with tiles whose constructors have finished """
+        if not self._pending_tiles:
+            return
+        for tile_n, future in list(self._pending_tiles.items()):
+            if not future.done():
+                continue
+            del self._pending_tiles[tile_n]
+            obj = future.result()  ## a constructor's exception is raised here, on the main thread
+            obj.tile_n = tile_n
+            self.tiles[tile_n] = obj
+            self.event_bus.invalidate()
+            self._clear_screen = True
+        if not self._pending_tiles:
+            self._tiles_ready()
+
+    def _tiles_ready(self):
+        _print("tile imports:")
+        TileManager.print_import_times()
+        if self._first_frame_done:
+            self._write_profile()
+
+    def _load_tile_config(self, tile_config):
+        pmconfig = self.configurator
+        ## load the tile dynamically
+        if type(tile_config) is str:
+            ## if tiledef is a string, it is the name of a tile config file
+            ## load the tile definition from the file
+            ## the file should be in JSON format
+            with timeline.span("tile config", file=tile_config):
+                tile_config = pmconfig.from_file(tile_config)
+                expand_dataclass(tile_config, {})  # Expand environment variables in the config
+        return tile_config
+
+    def _make_tile(self, tile_config):
+        ## import the tile using its name
+        ## all tiles should be in the "tiles" directory
+        clazz_name = tile_config.tile.clazz
+        try:
+            mod = TileManager.import_module(f"tiles.{clazz_name}_tile")
+        except ModuleNotFoundError as e:
+            msg = f"Error importing tile 'tiles.{clazz_name}_tile': {e}"
+            raise ImportError(f"{msg}\nBe sure to add the tile to your __init__.py file in the tiles directory.")
+        ## get the class from inside the tile
+        ## convert the file name to class name inside the tile
+        ## by convention the filename is snake_case and the class name is PascalCase
+        clazz_name = snake_to_pascal(clazz_name)
+        _print(f"Loading '{tile_config.tile.name}' tile, class {clazz_name} from {mod.__name__}")
+        clazz = getattr(mod, clazz_name + "Tile", None)
+        if clazz is None:
+            raise ImportError(f"Class '{clazz_name}tile' not found in tile '{mod.__name__}'")
+
+        ## create an instance of the class (tile)
+        ## and pass the PyMirror instance and the tile config to it
+        ## See pymirror.PMtile for the expected constructor
+        with timeline.span(f"{clazz_name}Tile.__init__", tile=tile_config.tile.name):
+            obj = clazz(self, tile_config)
+        return obj
 
     def _read_server_queue(self):
         ## add any messages that have come from the web server
+        acks = []
         try:
             while event := self.server_queue.get(0):
-                ## GLS - temporarily do an append
-                self.events.append(event)
                 _debug("queue: reading event:", event)
-                # self.publish_event(event)
+                self.event_bus.publish(event)
+                if event.get("event_id"):
+                    acks.append({"event_id": event["event_id"], "event": event.get("event")})
         except queue.Empty:
             # No new events in the queue
             pass
-
-    def _send_events_to_tile(self, tile, events):
-        if not tile.subscriptions: 
-            return
-        for event in events:
-            if event.event in tile.subscriptions:
-                if not event.tile or event.tile == tile.name:
-                    _debug(f"_send_events_to_tile: _send_events_to_tile to {tile.name} event:", event)
-                    tile.onEvent(event)
-
-    def _convert_events_to_namespace(self):
-        """ Convert a list of events to DefaultMunch objects """
-        return [DefaultMunch(**event) if isinstance(event, dict) else event for event in self.events]
+        if acks:
+            ## one message per frame, however many events came in
+            self.server.notify("ack", {"events": acks})
 
     def _send_events_to_tiles(self):
-        if not self.events: return
-        self.events = self._convert_events_to_namespace()  # Convert events to DefaultMunch if needed
-        for tile in self.tiles:
-            self._send_events_to_tile(tile, self.events)  # Send all events to the tile
-        self.events.clear()  # Clear the events after sending them
+        self.event_bus.dispatch()
 
     def publish_event(self, event: dict):
         _debug("publish_event", event)
-        ## should this go on a seperate event list?
-        ## if a tile sends an event from inside an event dispatcher
-        ## then it may not get processed
-        ## GLS - so for now we put it on the "server_queue"
-        self.server_queue.put(to_munch(event))
-
-        # if type(event) is dict:
-        #     self.events.append(DefaultMunch(**event))
-        # elif isinstance(event, DefaultMunch):
-        #     self.events.append(event)
-        # else:
-        #     raise TypeError(f"Event must be a dict or DefaultMunch, got {type(event)}")
+        ## events published by tiles (even from inside an event handler)
+        ## are delivered in the same frame (see PMEventBus.dispatch)
+        self.event_bus.publish(event)
 
     def _stats_for_nerds(self, tile):
         if not tile.bitmap: 
@@ -206,18 +266,55 @@ class PyMirror:
 
     def full_render(self):
         self.screen.bitmap.clear()
+        self._update_occlusion()
         for tile in reversed(self.tiles):
-            if tile.disabled or not tile.bitmap: continue
+            if tile.disabled or tile.occluded or not tile.bitmap: continue
             tile.render(force=True)
-            self.screen.bitmap.paste(tile.bitmap, tile.bitmap.x0, tile.bitmap.y0, mask=tile.bitmap)
+            tile.opaque = tile.is_opaque()
+            self._paste(tile)
+            tile.damage = None
         if self.debug: self._stats_for_nerds(tile)
         self.screen.flush()  # Flush the screen to show all tiles at once
+        self._frame_done(self.tiles, full=True)
+
+    def _paste(self, tile, damage=None):
+        ## opaque tiles are copied; the rest are alpha-blended
+        ## damage (x0, y0, x1, y1 in the tile's bitmap) limits it to one part the tile redrew
+        self.screen.bitmap.paste(tile.bitmap, tile.bitmap.x0, tile.bitmap.y0, mask=None if tile.opaque else tile.bitmap, box=damage)
+
+    def _update_occlusion(self):
+        """ Mark the tiles that are completely covered by a higher (earlier) opaque tile """
+        key = tuple((tile.disabled, tile.opaque, _bbox(tile.bitmap.rect) if tile.bitmap else None) for tile in self.tiles)
+        if key == self._occlusion_key:
+            return
+        self._occlusion_key = key
+        covers = []  # rects of the opaque tiles above the current one
+        sx0, sy0, sx1, sy1 = _bbox(self.screen.rect)
+        uncovered = False
+        for tile in self.tiles:
+            occluded = False
+            if tile.bitmap and not tile.disabled:
+                ## only the on-screen part of a tile needs covering
+                x0, y0, x1, y1 = _bbox(tile.bitmap.rect)
+                x0, y0, x1, y1 = max(x0, sx0), max(y0, sy0), min(x1, sx1), min(y1, sy1)
+                occluded = any(cx0 <= x0 and cy0 <= y0 and x1 <= cx1 and y1 <= cy1 for cx0, cy0, cx1, cy1 in covers)
+                if tile.opaque and not occluded:
+                    covers.append((x0, y0, x1, y1))
+            if tile.occluded and not occluded:
+                uncovered = True
+            if occluded != tile.occluded:
+                _debug(f"tile {tile.name} occluded: {occluded}")
+            tile.occluded = occluded
+        if uncovered:
+            ## a tile that was hidden (and so not kept up to date) is visible again
+            self._clear_screen = True
 
     def _exec_tiles(self):
         tiles_changed = []
         
+        self._update_occlusion()
         for tile in self.tiles:
-            if not tile.disabled:
+            if not tile.disabled and not tile.occluded:
                 tile._time = 0.0  # Reset the time for each tile
                 start_time = time.time()  # Start timing the tile execution
                 state_changed = tile.exec() # update tile state (returns True if the state has changed)
@@ -242,22 +339,85 @@ class PyMirror:
                     gfx = self.bitmap.gfx.push(tile.bitmap.gfx)
                     self.bitmap.rectangle(self.tile.bitmap.erect)
                 tile.render(force=self.force_render)
+                if tile.damage is None:
+                    tile.opaque = tile.is_opaque()
+                elif tile.opaque:
+                    ## after a partial redraw, an opaque tile only needs the redrawn parts checked
+                    ## (a tile that isn't opaque stays that way until it's redrawn in full: blending it is always safe)
+                    tile.opaque = all(tile.is_opaque(box) for box in tile.damage)
                 end_time = time.time()  # End timing the tile rendering
                 if tile._time:
                     tile._time += end_time - start_time  # add on the time taken for tile rendering
 
     def _update_screen(self, tiles_changed):
         updated = False
+        regions = []  # screen bboxes that were pasted
         for tile in reversed(self.tiles):
             if (not tile.disabled) and tile.bitmap and tile in tiles_changed:
+                damage, tile.damage = tile.damage, None
+                if damage == []:
+                    continue  # render() changed nothing
                 start_time = time.time()  # Start timing the tile rendering
-                self.screen.bitmap.paste(tile.bitmap, tile.bitmap.x0, tile.bitmap.y0, mask=tile.bitmap)
+                if damage is None:
+                    self._paste(tile)
+                    regions.append(_bbox(tile.bitmap.rect))
+                else:
+                    ## only the parts the tile redrew (clipped to its bitmap)
+                    bx0, by0 = tile.bitmap.x0, tile.bitmap.y0
+                    for x0, y0, x1, y1 in damage:
+                        box = (max(x0, 0), max(y0, 0), min(x1, tile.bitmap.width - 1), min(y1, tile.bitmap.height - 1))
+                        self._paste(tile, box)
+                        regions.append((bx0 + box[0], by0 + box[1], bx0 + box[2], by0 + box[3]))
                 end_time = time.time()  # End timing the tile rendering
                 tile._time += end_time - start_time  # add on the time taken for tile rendering
                 if self.debug: self._stats_for_nerds(tile) # draw boxes around each tile if debug is enabled
                 updated = True
         if updated:
             self.screen.flush()
+            self._frame_done(tiles_changed, regions=regions)
+
+    def _frame_done(self, tiles_changed, full=False, regions=None):
+        """ Tell the /live clients that a new frame was written """
+        self._frame += 1
+        if self.server and self.server.stream.has_clients():
+            if full or regions is None:
+                regions = [_bbox(tile.bitmap.rect) for tile in ([self.screen] if full else tiles_changed) if tile.bitmap]
+            for region in regions:
+                self._stream_dirty = _union(self._stream_dirty, region)
+        if self.server and self.server.live.has_clients():
+            self.server.notify("frame", {"frame": self._frame, "time": time.time(), "tiles": [tile.name for tile in tiles_changed]})
+
+    def _stream_frame(self):
+        """ Hand the screen to the /stream.mjpg encoder (only while someone is watching, at most stream_fps) """
+        stream = self.server.stream if self.server else None
+        if not (stream and stream.wants_frame()):
+            return
+        if stream.need_full():
+            self._stream_dirty = _union(None, self.screen.rect)
+        if self._stream_dirty:
+            x0, y0, x1, y1 = self._stream_dirty
+            rect = self.screen.rect
+            self._stream_dirty = (max(x0, rect.x0), max(y0, rect.y0), min(x1, rect.x1), min(y1, rect.y1))
+            ## only the changed part is copied here (so the encoder thread never sees a half-drawn frame);
+            ## converting it to RGB and encoding happen on the encoder thread
+            x0, y0, x1, y1 = self._stream_dirty
+            stream.offer(self.screen.bitmap._img.crop((x0, y0, x1 + 1, y1 + 1)), self._stream_dirty, self.screen.bitmap._img.size)
+            self._stream_dirty = None
+
+    def _publish_metrics(self):
+        if not (self.server and self.server.live.has_clients()):
+            return
+        now = time.time()
+        if now - self._metrics_time < self.live_metrics_interval:
+            return
+        self._metrics_time = now
+        self.server.notify("metrics", {
+            "frame": self._frame,
+            "time": now,
+            "events_pending": self.event_bus.pending(),
+            "events_coalesced": self.event_bus.coalesced,
+            "tiles": {tile.name: {"ms": round((tile._time or 0.0) * 1000, 2), "disabled": bool(tile.disabled)} for tile in self.tiles},
+        })
 
     def _time(self, fn, *args):
         t0 = time.time()
@@ -266,14 +426,39 @@ class PyMirror:
         _debug(getattr(fn, "__name__", repr(fn)), ":", f"{(t1-t0)*1000} ms")
         return result
 
+    def _first_frame(self):
+        with timeline.span("first frame"):
+            self._swap_ready_tiles()
+            self._read_server_queue()
+            self._send_events_to_tiles()
+            tiles_changed = self._exec_tiles()
+            self._render_tiles(tiles_changed)
+            self._update_screen(tiles_changed)
+        self._first_frame_done = True
+        if not self._pending_tiles:
+            self._write_profile()
+
+    def _write_profile(self):
+        ## after the first frame and once every pooled tile is constructed (see _tiles_ready),
+        ## so the worker threads' imports and constructors are in the profile
+        if timeline.enabled:
+            timeline.stop()
+            timeline.write(self._profile_startup)
+            _print(timeline.summary())
+            _print(f"startup profile written to {self._profile_startup}.trace.json / .txt")
+
     def run(self):
         try:
+            self._first_frame()
             while True:
+                self._swap_ready_tiles()
                 self._time(self._read_server_queue)
                 self._time(self._send_events_to_tiles)
                 tiles_changed = self._time(self._exec_tiles)
                 self._time(self._render_tiles, tiles_changed)
                 self._time(self._update_screen, tiles_changed)
+                self._stream_frame()
+                self._publish_metrics()
                 # _debug("---")
                 time.sleep(0.01) # Sleep for a short time to give pmserver a chance to process web requests
                 _debug("...")
@@ -325,7 +510,23 @@ def main():
         help="Output file path for screen capture (supports .jpg, .png formats). "
             "Overrides the output_file setting in config."
     )
+    parser.add_argument(
+        "--config_cache",
+        metavar="PATH",
+        default="$HOME/.cache/pymirror/config_cache.pickle",
+        help="Compiled config cache file, or 'None' to always parse the configs"
+    )
+    parser.add_argument(
+        "--profile-startup", "--profile_startup",
+        dest="profile_startup",
+        metavar="PREFIX",
+        nargs="?",
+        const="startup",
+        help="Profile startup through the first frame; writes PREFIX.trace.json (chrome://tracing, Perfetto) and PREFIX.txt"
+    )
     args = parser.parse_args()
+    if args.profile_startup:
+        timeline.start()  ## no-op if it was started at import time
     pm = PyMirror(args.config, DefaultMunch(**vars(args)))
     pm.run()
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, and_
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, and_
 from glslib.glsdb import Base
 from sqlalchemy.orm import declarative_base
 
@@ -13,5 +13,8 @@ class WebApiTable(Base):
     last_rc = Column(Integer)
     rate_limit_secs = Column(Integer)
     retry_after_secs = Column(Integer)
-    result_text = Column(String)
+    result_text = Column(String)        # legacy: uncompressed payload (see glslib.payload)
+    result_hash = Column(String)
+    result_zip = Column(LargeBinary)
+    result_snapshot = Column(LargeBinary)
     params = Column(String)
@@ -40,7 +40,7 @@ def _compute_hand_posn(x0, y0, r, value, divisor, offset):
 class AnalogClockTile(PMTile):
 	def __init__(self, pm, config):
 		super().__init__(pm, config)
-		self._analog_clock = config.analog_clock
+		self._analog_clock: AnalogClockConfig = pm.configurator.from_dict(config.analog_clock or {}, AnalogClockConfig)
 		self.second_hand = self._analog_clock.second_hand
 		self.minute_hand = self._analog_clock.minute_hand
 		self.hour_hand = self._analog_clock.hour_hand
@@ -63,17 +63,25 @@ class AnalogClockTile(PMTile):
 			hrs, rect = posn
 			self.bitmap.text_box(rect, hrs, valign="center", halign="center")
 
+	def _render_static(self, dx, dy, r):
+		self.bitmap.clear()
+		self._render_clock_face(dx, dy, r)
+
 	def render(self, force: bool = False) -> bool:
 		now = datetime.now()
-		self.bitmap.clear()
 		save_color = self.bitmap.gfx.color
+		save_line_width = self.bitmap.gfx.line_width
 		gfx = self.bitmap.gfx
-		dx = gfx.width/2
-		dy = gfx.height/2
+		dx = self.bitmap.width/2
+		dy = self.bitmap.height/2
 		if dx < dy: r = dx
 		else: r = dy
 
-		self._render_clock_face(dx, dy, r)
+		## the face only changes with the size, colors or font of the tile; just the hands are drawn each time
+		## (the key has every gfx setting the face is drawn with)
+		key = (dx, dy, r, gfx.bg_color, gfx.color, gfx.line_width,
+			gfx._text_color, gfx._text_bg_color, gfx.font.name, gfx.font.pitch, gfx.font_baseline, gfx.font_y_offset)
+		self.static_layer(lambda: self._render_static(dx, dy, r), key)
 
 		if self.hour_hand is not None:
 			hr_posn = _compute_hand_posn(dx, dy, r*self.hour_length, now.hour + now.minute/60 + now.second/3600, 12.0, -3.0)
@@ -97,6 +105,7 @@ class AnalogClockTile(PMTile):
 			self.last_second = now.second
 
 		self.bitmap.gfx.color = save_color
+		self.bitmap.gfx.line_width = save_line_width
 		_debug("analog_clock", now)
 		return True
 
@@ -5,6 +5,8 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 from sqlalchemy import  and_
 from pymirror.pmcard import PMCard
+from pymirror.pmdatawatch import PMDataWatch
+from pymirror.pmtimer import PMTimer
 from glslib.gson import json_read
 from glslib.strftime import strftime_by_example
 from glslib.to_types import to_dict, to_munch, to_utc_epoch
@@ -17,6 +19,7 @@ class IcalConfig:
     calendar_name: str = "gregs_calendar"
     title: str = "iCalendar"
     refresh_time: str = "60m"
+    poll_time: str = "60s"  # how often the calendar's data version is checked (catches a missed DataChangedEvent)
     max_events: int = 10
     number_days: int = 7
     title_format: str = strftime_by_example("Jul 1776")
@@ -44,6 +47,15 @@ class IcalTile(PMCard):
         self.prev_weeks = self._ical.prev_weeks
         self.rows = self._ical.rows
         self._read_holidays()
+        self.subscribe("DataChangedEvent")
+        ## pmtaskmgr versions the ical data by calendar name
+        self.watch = PMDataWatch(self.pmdb, self._ical.calendar_name)
+        self.poll_timer = PMTimer(self._ical.poll_time)
+
+    def onDataChangedEvent(self, event):
+        ## re-query on the next exec
+        if self.watch.on_event(event):
+            self.timer.reset(0)
 
     def _read_holidays(self):
         for holiday_file in self._ical.holiday_files:
@@ -214,10 +226,18 @@ class IcalTile(PMCard):
             super().render(force)
 
     def exec(self) -> bool:
+        if self.poll_timer.is_timedout():
+            ## the version row is cheap to read; re-query early if pmtaskmgr wrote new events
+            ## (no version at all means an older pmtaskmgr: just wait for refresh_time)
+            self.poll_timer.reset()
+            self.watch.poll()
+            if self.watch.latest is not None and self.watch.is_changed():
+                self.timer.reset(0)
         if not self.timer.is_timedout(): 
             return False
             # return is_dirty # early exit if not timed out
         self.timer.reset(self._ical.refresh_time)
+        self.watch.consume()
 
         now = datetime.now() - timedelta(weeks=self.prev_weeks)
         later = (now + timedelta(hours=24 * self._ical.number_days))
@@ -41,7 +41,7 @@ class PlotTile(PMTile):
     def render(self, force: bool) -> bool:
         if not (self.plot.is_dirty() or force):
             return False
-        self.plot.render(self.bitmap)
+        self.plot.render(self.bitmap, self.static_layer)
         self.plot.clean()
         return True
 
@@ -1,7 +1,7 @@
 import copy
 
 from munch import DefaultMunch
-from glslib.glsdb import GLSDb
+from glslib.glsdb import GLSDb, format_to_binds
 from pymirror.pmtile import PMTile
 from components.pm_table_component import PMCell, PMTableComponent, TableConfig
 from dataclasses import dataclass
@@ -23,8 +23,9 @@ class SqlTableTile(PMTile):
 		if self._sql_table.sql_file:
 			with open(self._sql_table.sql_file, "r") as f:
 				self._sql_table.sql = f.read()
-			if self._sql_table.sql_params:
-				self._sql_table.sql = self._sql_table.sql.format(**self._sql_table.sql_params)
+		if self._sql_table.sql_params:
+			## sql_params are bound (not formatted) so the statement stays cacheable
+			self._sql_table.sql = format_to_binds(self._sql_table.sql)
 
 	def _create_table(self, config) -> TableConfig:
 		if hasattr(config, "table"):
@@ -41,9 +42,9 @@ class SqlTableTile(PMTile):
 		table = PMTableComponent(self.bitmap.gfx, _config, 0, 0, self.bitmap.width, self.bitmap.height)
 		return table
 	
-	def _read_sql(self, query) -> list:
+	def _read_sql(self, query, params=None) -> list:
 		rows = []
-		data = self.db.query(query)
+		data = self.db.query(query, params)
 		i = 0
 		row_colors = ["#010", "#030"]
 		header = None
@@ -67,7 +68,7 @@ class SqlTableTile(PMTile):
 		if not self.timer.is_timedout():
 			return False
 		self.timer.reset()
-		self.header, self.rows = self._read_sql(self._sql_table.sql)
+		self.header, self.rows = self._read_sql(self._sql_table.sql, self._sql_table.sql_params)
 		self.pmtable: PMTableComponent = self._create_table(self._config)
 		self.pmtable.set_rows(self.rows)
 		return True
@@ -27,6 +27,13 @@ class WeatherTile(PMCard):
         elif config.accuweather:
             from weather_apis.accuweather import AccuWeatherApi
             self.api = AccuWeatherApi(config.accuweather)
+        self.subscribe("DataChangedEvent")
+
+    def onDataChangedEvent(self, event):
+        ## only the db-backed api has a watch; refresh on the next exec
+        watch = getattr(self.api, "watch", None)
+        if watch and watch.on_event(event):
+            self.timer.reset(0)
 
     def exec(self) -> bool:
         is_dirty = super().exec()
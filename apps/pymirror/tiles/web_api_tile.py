@@ -3,10 +3,10 @@ import json
 import time
 from munch import DefaultMunch
 import requests
-import copy
 
 from pymirror.pmcard import PMCard
-from pmutils import expand_dict, json_loads, to_ms
+from pmutils import json_loads, to_ms
+from glslib.projection import Projection
 from pymirror.pmtimer import PMTimer
 from pymirror.pmwebapi import PMWebApi
 from glslib.logger import _debug, _debug, _error, _debug
@@ -19,6 +19,7 @@ class WebApiTile(PMCard):
         _debug("xxx... cache_file", self._web_api.__dict__)
         self.api = PMWebApi(url=self._web_api.url, poll_time=self._web_api.poll_time, cache_file=self._web_api.cache_file)
         self.display_timer = PMTimer(self._web_api.cycle_time)
+        self.projection = Projection(self._web_api.display.__dict__)
         self.dirty = False
 
         self.response = None
@@ -31,27 +32,7 @@ class WebApiTile(PMCard):
 
     def _parse_items(self, force: bool = False) -> int:
         _debug("_parse_items")
-        context = {
-            "_n_": 0,
-            "payload": self.response,
-        }
-        self.items = []
-
-         # extract the maximum number of items to display
-        template_dict = copy.copy(self._web_api.display.__dict__)
-        expand_dict(template_dict, context)
-        max_items = int(template_dict.get("max", "1"))
-        total_items = int(template_dict.get("total", "1"))
-        if total_items > max_items:
-            total_items = max_items
-        for n in range(total_items):
-            context["_n_"] = n
-            template_dict = copy.copy(self._web_api.display.__dict__)
-            expand_dict(template_dict, context, "__error__") # extract the 'nth' item to display
-            # if any of the display fields are "__error__", skip this item
-            if "__error__" in template_dict.values():
-                continue
-            self.items.append(template_dict)
+        self.items = self.projection.project(self.response)
         self.item_number = 0
         return len(self.items)
     
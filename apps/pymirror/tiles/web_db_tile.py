@@ -1,11 +1,10 @@
 import time
-import copy
 
 from pymirror.pmcard import PMCard
-from glslib.strings import expand_dict
-from glslib.gson import json_loads
-from glslib.to_types import to_dict
+from glslib.projection import Projection
+from glslib.payload import payload_hash, unpack_payload
 from pymirror.pmtimer import PMTimer
+from pymirror.pmdatawatch import PMDataWatch
 from glslib.logger import _debug
 from tables.web_api_table import WebApiTable
 
@@ -27,6 +26,7 @@ class WebDbTile(PMCard):
 		super().__init__(pm, config)
 		self._web_db: WebDbConfig = pm.configurator.from_dict(config.web_db, WebDbConfig)
 		self.display_timer = PMTimer(self._web_db.cycle_time)
+		self.projection = Projection(self._web_db.display)
 		self.dirty = False
 		self.text = None
 		self.last_text = None
@@ -34,42 +34,29 @@ class WebDbTile(PMCard):
 		self.response = None
 		self.update(None, "(loading...)", None)  # Initialize with empty strings
 		self.subscribe("KeyboardEvent")
+		self.subscribe("DataChangedEvent")
+		self.watch = PMDataWatch(self.pmdb, self.name)
 		self.items = []
 
 	def _parse_items(self, force: bool = False) -> int:
 		_debug("_parse_items")
-		context = {
-			"_n_": 0,
-			"payload": self.response,
-		}
-		self.items = []
-
-		 # extract the maximum number of items to display
-		template_dict = copy.copy(self._web_db.display)
-		expand_dict(template_dict, context)
-		max_items = int(template_dict.get("max", "1"))
-		total_items = int(template_dict.get("total", "1"))
-		if total_items > max_items:
-			total_items = max_items
-		for n in range(total_items):
-			context["_n_"] = n
-			template_dict = copy.copy(self._web_db.display)
-			expand_dict(template_dict, context, "__error__") # extract the 'nth' item to display
-			# if any of the display fields are "__error__", skip this item
-			if "__error__" in template_dict.values():
-				continue
-			self.items.append(template_dict)
+		self.items = self.projection.project(self.response)
 		self.item_number = 0
 		return len(self.items)
 	
 	def _read_db(self):
 		_debug("_read_db")
+		if not self.watch.is_changed():
+			_debug("... data_version unchanged")
+			return
+		self.watch.consume()
 		record = self.pmdb.get_where(WebApiTable, WebApiTable.name == self.name)
 		if record == None:
 			_debug("... db.get_where() returns None")
 			return
-		_debug(to_dict(record))
-		self.text = record.result_text
+		_debug(record.name, record.last_time, record.result_hash)
+		## legacy rows only have result_text
+		self.text = record.result_hash or (record.result_text and payload_hash(record.result_text))
 		if not self.text:
 			_debug("... db.get_where() returns None")
 			return
@@ -78,7 +65,7 @@ class WebDbTile(PMCard):
 			return
 		self.last_text = self.text
 		self.last_time = record.last_time
-		self.response = json_loads(self.text)
+		self.response = unpack_payload(record.result_snapshot, record.result_zip, record.result_text)
 		_debug("... new response... let's parse it")
 		self._parse_items()
 
@@ -113,6 +100,15 @@ class WebDbTile(PMCard):
 			self.dirty = True
 			self.response = None ## HACK - this forces a redisplay... questionable
 
+	def onDataChangedEvent(self, event):
+		## pmtaskmgr wrote new data... show it now rather than at the next cycle
+		if not self.watch.on_event(event):
+			return
+		self._read_db()
+		self._display_next_item()
+		self.display_timer.reset()
+		self.dirty = True
+
 	def exec(self) -> bool:
 		_debug("web_db_module dirty=", self.dirty)
 		self.dirty = super().exec()
@@ -120,6 +116,7 @@ class WebDbTile(PMCard):
 
 		if self.display_timer.is_timedout():
 			_debug("... timer: ", time.time(), self.display_timer.future_time)
+			self.watch.poll()
 			self._read_db()
 			self._display_next_item()
 			self.display_timer.reset()
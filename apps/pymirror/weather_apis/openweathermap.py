@@ -1,10 +1,11 @@
 from glslib.glsdb import GLSDb
-from glslib.gson import  json_loads
+from glslib.payload import payload_hash, unpack_payload
 from glslib.logger import pprint
 from glslib.to_types import to_dict, to_munch
 from tables.web_api_table import WebApiTable
 from .pmweatherdata import PMWeatherData
 from glslib.logger import _debug
+from pymirror.pmdatawatch import PMDataWatch
 
 from dataclasses import dataclass
 
@@ -33,30 +34,40 @@ class OpenWeatherMapApi:
         self.name = name
         self.text = ""
         self.last_text = None
+        self.watch = PMDataWatch(pmdb, name)
+        self.weather = None
 
     def get_weather_data(self) -> PMWeatherData:
         """
         Fetches weather data from the OpenWeatherMap API.
         If params are provided, they will be used in the request.
         """
-        _record = self.pmdb.get_where(WebApiTable, WebApiTable.name == self.name)
-        record = to_munch(to_dict(_record))
+        self.watch.poll()
+        if self.weather and not self.watch.is_changed():
+            _debug("... data_version unchanged")
+            return self.weather
+        record = self.pmdb.get_where(WebApiTable, WebApiTable.name == self.name)
         if not record:
             _debug("... db.get_where() returns None")
             return
-        self.text = record.result_text
+        ## legacy rows only have result_text
+        self.text = record.result_hash or (record.result_text and payload_hash(record.result_text))
         if not self.text:
             _debug("... db.get_where() returns None")
             return
-        if self.last_text == self.text:
+        if self.weather and self.last_text == self.text:
             _debug("... db.get_where() returns same value")
-            return
-        weather_dict = json_loads(self.text)
+            self.watch.consume()
+            return self.weather
+        weather_dict = unpack_payload(record.result_snapshot, record.result_zip, record.result_text)
         weather = PMWeatherData.from_dict(weather_dict)
         if weather.alerts:
             for alert in weather.alerts:
                 if alert.description:
                     alert.description = _paragraph_fix(alert.description)
+        self.watch.consume()
+        self.last_text = self.text
+        self.weather = weather
         return weather
 
 if __name__ == "__main__":
@@ -27,6 +27,6 @@ END AS "$$/mi",
     '$' || CAST(ROUND(SUM(total_earnings) OVER (ORDER BY trip_start),0) AS INTEGER) AS "Total $$" 
         FROM trips 
 WHERE trip_status in ('Completed', 'In-progress', 'Booked') 
-AND vehicle_nickname = '{vehicle_nickname}' 
-AND trip_start >= date('now', '-{months_ago} month') 
+AND vehicle_nickname = :vehicle_nickname 
+AND trip_start >= date('now', '-' || :months_ago || ' month') 
 ORDER BY trip_start 
@@ -1,2 +1,3 @@
 import turo_trips_table
-import turo_vehicles_table
\ No newline at end of file
+import turo_vehicles_table
+import turo_summary_table
\ No newline at end of file
@@ -0,0 +1,56 @@
+from sqlalchemy import Column, Date, DateTime, Integer, String, Float, column, func, table
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+## written by the turo_summary task (pmtaskmgr); the turo tiles read them instead of the raw trips
+
+class TuroDailySummaryTable(Base):
+    ## a trip's earnings and distance spread evenly over the days it covers
+    __tablename__ = 'turo_daily'
+    vehicle_nickname = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    earnings = Column(Float)
+    distance = Column(Float)
+    trips = Column(Integer)
+
+class TuroMonthlySummaryTable(Base):
+    ## earnings, days, trips and distance by the month of trip_end (like turo_calculations);
+    ## booked_days and utilization (percent) by the calendar days actually booked in the month
+    __tablename__ = 'turo_monthly'
+    vehicle_nickname = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    trip_status = Column(String, primary_key=True)
+    earnings = Column(Float)
+    days = Column(Integer)
+    trips = Column(Integer)
+    distance = Column(Float)
+    booked_days = Column(Integer)
+    utilization = Column(Float)
+
+class TuroSummaryStateTable(Base):
+    ## what each vehicle's trips looked like when its summary was last written
+    __tablename__ = 'turo_summary_state'
+    vehicle_nickname = Column(String, primary_key=True)
+    fingerprint = Column(String)
+    updated_time = Column(DateTime)
+
+## the trips columns the fingerprint reads (the trips model itself lives with the tiles)
+TRIPS = table("trips", *(column(name) for name in (
+    "id", "vehicle_nickname", "trip_status", "trip_start", "trip_end", "trip_days", "total_earnings", "distance_traveled")))
+
+def status_code(status):
+    ## a trip_status's length and first two characters, so statuses of the same length
+    ## ("Completed" / "Cancelled", "Guest cancellation" / "Host cancellation") change the fingerprint too
+    ## (SQLite has no hash function; reading more of the string, or its end, makes the fingerprint much slower)
+    return func.coalesce((func.length(status) * 131 + func.unicode(status)) * 131 + func.unicode(func.substr(status, 2, 1)), 0)
+
+def trips_fingerprint() -> tuple:
+    """ Aggregates over the trips that change when one is added, removed or edited
+    (select them alone for the whole table, or GROUP BY vehicle_nickname for each vehicle) """
+    t = TRIPS.c
+    return (
+        func.count(), func.max(t.id), func.sum(t.total_earnings), func.sum(t.trip_days), func.sum(t.distance_traveled),
+        func.max(t.trip_start), func.max(t.trip_end), func.sum(t.id * status_code(t.trip_status)),
+    )
@@ -1,4 +1,5 @@
 import turo_calculations
+import turo_aggregates
 import turo_next_tile
 import turo_trip_tile
 import turo_plot_tile
@@ -0,0 +1,95 @@
+from sqlalchemy import extract, func, inspect, select
+
+from glslib.glsdb import GLSDb
+from glslib.logger import _debug
+from tables.turo_trips_table import TuroTripsTable
+from tables.turo_summary_table import TuroMonthlySummaryTable, TuroSummaryStateTable, trips_fingerprint
+
+def summary_fingerprint(conn):
+    """ None unless the turo_summary task (pmtaskmgr) has written the summary tables """
+    if not inspect(conn).has_table(TuroSummaryStateTable.__tablename__):
+        return None
+    s = TuroSummaryStateTable.__table__
+    fingerprint = tuple(conn.execute(select(func.count(), func.max(s.c.updated_time))).one())
+    return fingerprint if fingerprint[0] else None
+
+def has_summary(db: GLSDb) -> bool:
+    with db.engine.connect() as conn:
+        return summary_fingerprint(conn) is not None
+
+class TuroAggregates:
+    """
+    Earnings, days and trip counts per (vehicle, status, year, month of trip_end),
+    read from turo_monthly when the turo_summary task maintains it,
+    otherwise summed by one grouped SQL query over the trips for all vehicles.
+    One instance per database (see for_db) so every turo tile shares it,
+    and it's only recomputed when the trips table changes.
+    """
+    _instances = {}
+
+    @classmethod
+    def for_db(cls, db: GLSDb) -> "TuroAggregates":
+        key = str(db.engine.url)
+        if key not in cls._instances:
+            cls._instances[key] = cls(db)
+        return cls._instances[key]
+
+    def __init__(self, db: GLSDb):
+        self.db = db
+        self.fingerprint = None
+        self.groups = {}  # (nickname, status, year, month) -> [earnings, days, trips]
+
+    def _fingerprint(self, conn):
+        ## a cheap summary that changes when trips are added, removed or edited (the same one the turo_summary task keeps)
+        return tuple(conn.execute(select(*trips_fingerprint())).one())
+
+    def refresh(self) -> bool:
+        """ Re-read the totals if the trips (or their summary) changed; returns True if it did """
+        with self.db.engine.connect() as conn:
+            summary = summary_fingerprint(conn)
+            fingerprint = ("summary",) + summary if summary else self._fingerprint(conn)
+            if fingerprint == self.fingerprint:
+                return False
+            if summary:
+                m = TuroMonthlySummaryTable.__table__
+                rows = conn.execute(
+                    select(m.c.vehicle_nickname, m.c.trip_status, m.c.year, m.c.month, m.c.earnings, m.c.days, m.c.trips)
+                ).all()
+            else:
+                t = TuroTripsTable.__table__
+                year = extract("year", t.c.trip_end)
+                month = extract("month", t.c.trip_end)
+                rows = conn.execute(
+                    select(
+                        t.c.vehicle_nickname, t.c.trip_status, year, month,
+                        func.coalesce(func.sum(t.c.total_earnings), 0),
+                        func.coalesce(func.sum(t.c.trip_days), 0),
+                        func.count(),
+                    ).group_by(t.c.vehicle_nickname, t.c.trip_status, year, month)
+                ).all()
+        self.groups = {}
+        for nickname, status, yy, mm, earnings, days, trips in rows:
+            key = (nickname, status, int(yy) if yy is not None else None, int(mm) if mm is not None else None)
+            self.groups[key] = [earnings or 0, days or 0, trips]
+        self.fingerprint = fingerprint
+        _debug(f"TuroAggregates: {len(rows)} groups" + (" (from turo_monthly)" if summary else ""))
+        return True
+
+    def _sum(self, column: int, nickname: str, statuses: list, year: int = None, month: int = None):
+        total = 0
+        for (_nickname, status, yy, mm), values in self.groups.items():
+            if _nickname != nickname or status not in statuses:
+                continue
+            if (year is not None and yy != year) or (month is not None and mm != month):
+                continue
+            total += values[column]
+        return total
+
+    def income(self, nickname: str, statuses: list, year: int = None, month: int = None) -> float:
+        return self._sum(0, nickname, statuses, year, month)
+
+    def days(self, nickname: str, statuses: list, year: int = None, month: int = None) -> int:
+        return self._sum(1, nickname, statuses, year, month)
+
+    def trips(self, nickname: str, statuses: list, year: int = None, month: int = None) -> int:
+        return self._sum(2, nickname, statuses, year, month)
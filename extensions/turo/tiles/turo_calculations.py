@@ -1,3 +1,5 @@
+from datetime import datetime
+
 def all_time_income(trips, status_list=["Booked", "Completed", "In-progress"]):
     total = 0
     for trip in trips:
@@ -5,10 +7,14 @@ def all_time_income(trips, status_list=["Booked", "Completed", "In-progress"]):
             total += trip.total_earnings
     return total
 
-def annual_income(trips, status_list=["Booked", "Completed", "In-progress"]):
+## these work on a list of trips already in memory;
+## see TuroAggregates (turo_aggregates.py) for the same sums done in SQL for every vehicle at once
+
+def annual_income(trips, status_list=["Booked", "Completed", "In-progress"], year=None):
+    year = year or datetime.now().year
     total = 0
     for trip in trips:
-        if trip.trip_status in status_list:
+        if trip.trip_status in status_list and trip.trip_end.year == year:
             total += trip.total_earnings
     return total
 
@@ -17,14 +23,15 @@ def monthly_income(trips, start_date, status_list=["Booked", "Completed", "In-pr
     for trip in trips:
         if trip.trip_status not in status_list:
             continue
-        if trip.trip_end.month == start_date.month:
+        if trip.trip_end.year == start_date.year and trip.trip_end.month == start_date.month:
             total += trip.total_earnings
     return round(total, 2)
 
-def annual_sum_of_days(trips, status_list=["Booked", "Completed", "In-progress"]):
+def annual_sum_of_days(trips, status_list=["Booked", "Completed", "In-progress"], year=None):
+    year = year or datetime.now().year
     total = 0
     for trip in trips:
-        if trip.trip_status not in status_list:
+        if trip.trip_status not in status_list or trip.trip_end.year != year:
             continue
         total += trip.trip_days
     return total
@@ -45,7 +45,7 @@ class TuroNextTile(PMCard):
             return False
             # return is_dirty # early exit if not timed out
         self.timer.reset(self._turo.refresh_time)
-        trips = self.turo_db.get_all_where(TuroTripsTable, f"vehicle_nickname='{self._turo.vehicle_nickname}'", order_by="trip_start")
+        trips = self.turo_db.get_all_where(TuroTripsTable, "vehicle_nickname = :vehicle_nickname", order_by="trip_start", params={"vehicle_nickname": self._turo.vehicle_nickname})
         self.set_header(f"Turo - {self._turo.vehicle_nickname}")
         msg = ""
         for trip in trips:
@@ -6,7 +6,8 @@ from munch import DefaultMunch
 
 from pymirror.pmtile import TileConfig
 
-from glslib.glsdb import GLSDb
+from glslib.glsdb import GLSDb, format_to_binds
+from glslib.expressions import RowView, compile_expression, evaluate
 from glslib.gson import json_dumps
 from glslib.strftime import strftime_by_example
 from glslib.to_types import to_munch
@@ -56,12 +57,13 @@ class TuroPlotTile(PMTile):
             sql_file = self.sql_file
             with open(sql_file, 'r') as f:
                 sql_content = f.read()
-            if self._turo.sql_params:
-                sql_content = sql_content.format(**self._turo.sql_params)
+        if self._turo.sql_params:
+            ## sql_params are bound (not formatted) so the statement stays cacheable
+            sql_content = format_to_binds(sql_content)
         return sql_content
 
     def render(self, force: bool) -> bool:
-        self.plot.render(self.bitmap)
+        self.plot.render(self.bitmap, self.static_layer)
         return False  # we will render in exec when we have the data
 
     def _min(self, _data, preferred=0, default=0):
@@ -81,7 +83,7 @@ class TuroPlotTile(PMTile):
             return False
             # return is_dirty # early exit if not timed out
         self.timer.reset(self._turo.refresh_time)
-        rows = self.turo_db.query(self._create_query())
+        rows = self.turo_db.query(self._create_query(), self._turo.sql_params)
         x_column_name = self._turo.x_column
         y_columns = [trace.column for trace in self._turo.traces]
         z_rows, x_axis, all_values = self._collate_data(rows, x_column_name, y_columns, self._turo.traces)
@@ -94,21 +96,20 @@ class TuroPlotTile(PMTile):
             # Create a copy without the 'vehicle' key instead of deleting
             trace_dict = {k: v for k, v in trace_data.items() if k not in ['vehicle', 'vehicle_column']}
             vehicle_trace = PMPlotTraceConfig(**trace_dict)
+            ## compiled once per trace (and cached by source), evaluated against a view of each row
+            label_code = compile_expression(vehicle_trace.label_format or "'label_format'")
+            width_code = compile_expression(vehicle_trace._width) if vehicle_trace._width else None
+            row = RowView()
             vehicle_points = []
             for k, v in z_rows.items():
                 point_data = v[vehicle_nickname]
                 if point_data[vehicle_trace.column] is None:
                     point = None
                 else:
-                    _width = None
-                    label_format = vehicle_trace.label_format or "'label_format'"
-                    # Flatten point_data to include all trip fields for eval
-                    eval_context = dict(point_data)
-                    if point_data.get('trip'):
-                        eval_context.update(point_data.trip)
-                    label = eval(label_format, {}, eval_context)
-                    if vehicle_trace._width:
-                        _width = eval(vehicle_trace._width, {}, eval_context)
+                    ## trip fields first, then the point's own (as if merged, without copying)
+                    row.maps = [point_data.trip, point_data] if point_data.get('trip') else [point_data]
+                    label = evaluate(label_code, row)
+                    _width = evaluate(width_code, row) if width_code else None
                     point = PMPointConfig(
                         y=point_data.trip.get(vehicle_trace.column, 0), 
                         _width=_width,
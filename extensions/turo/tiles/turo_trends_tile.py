@@ -1,16 +1,17 @@
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
 
 from munch import DefaultMunch
 
-from glslib.to_types import to_munch
 from pymirror.pmtile import TileConfig
 
 from glslib.glsdb import GLSDb
 from glslib.strftime import strftime_by_example
 from components.pm_plot_component import PMPlotAxisConfig, PMPlotComponent, PMPlotComponentConfig, PMPlotTraceConfig, PMPointConfig
 from pymirror.pmtile import PMTile
+from tiles.turo_aggregates import has_summary
 
 @dataclass
 class TuroTrendsTraceConfig(PMPlotTraceConfig):
@@ -43,74 +44,77 @@ class TuroTrendsTile(PMTile):
         self.y_axis_config.format = strftime_by_example(self._trends.y_axis.format or self._trends.date_format or "%Y-%m-%d")
         self.sql_file: str = self._trends.sql_file or  Path(__file__).parent / "turo_plot.sql"
 
-    def _create_query(self, vehicle_nickname="sentra"):
-        sql = f"""
-            SELECT * 
-            FROM qtrips 
-            WHERE TRUE 
-            AND vehicle_nickname = '{vehicle_nickname}'
-            ORDER BY date
-        """
-        return sql
+    def _create_query(self, nicknames):
+        ## one query for all the traces' vehicles
+        ## turo_daily (kept by the turo_summary task) has one row per vehicle per day; qtrips one per trip per day
+        binds = ", ".join(f":nickname_{i}" for i in range(len(nicknames)))
+        if has_summary(self.turo_db):
+            sql = f"""
+                SELECT vehicle_nickname, date, earnings AS daily_earnings, distance AS daily_distance_traveled
+                FROM turo_daily
+                WHERE vehicle_nickname IN ({binds})
+                ORDER BY date
+            """
+        else:
+            sql = f"""
+                SELECT vehicle_nickname, date, daily_earnings, daily_distance_traveled
+                FROM qtrips 
+                WHERE TRUE 
+                AND vehicle_nickname IN ({binds})
+                ORDER BY date
+            """
+        return sql, {f"nickname_{i}": nickname for i, nickname in enumerate(nicknames)}
+
+    def _trips_by_vehicle(self, nicknames):
+        """ {nickname: {date: (earnings, distance)}} for all the vehicles, grouped once """
+        by_vehicle = {nickname: {} for nickname in nicknames}
+        if not nicknames:
+            return by_vehicle
+        sql, params = self._create_query(nicknames)
+        for trip in self.turo_db.query(sql, params):
+            the_date = trip["date"]
+            if isinstance(the_date, datetime):
+                the_date = the_date.date()
+            days = by_vehicle[trip["vehicle_nickname"]]
+            earnings, distance = days.get(the_date, (0, 0))
+            days[the_date] = (earnings + (trip["daily_earnings"] or 0), distance + (trip["daily_distance_traveled"] or 0))
+        return by_vehicle
 
     def render(self, force: bool) -> bool:
-        self.plot.render(self.bitmap)
+        self.plot.render(self.bitmap, self.static_layer)
         return False  # we will render in exec when we have the data
 
-    def _aggregate_data(self, window):
-        window_size = len(window)
-        if window_size == 0:
-            return
-        count = sum([1 for trip in window if trip is not None])
-        daily_earnings = sum([trip.daily_earnings for trip in window if trip is not None])
-        daily_distance_traveled = sum([trip.daily_distance_traveled for trip in window if trip is not None])
-        avg_count = round((count/window_size if window_size else 0 )* 100, 1)
-        avg_earnings = round(daily_earnings/count if count else 0, 2)
-        avg_distance = round(daily_distance_traveled/count if count else 0, 0)
-        data = DefaultMunch()
-        data.count = count
-        data.daily_earnings = daily_earnings
-        data.daily_distance_traveled = daily_distance_traveled
-        data.avg_count = avg_count
-        data.avg_earnings = avg_earnings
-        data.avg_distance = avg_distance
-        return data
-
-    def _collect_averages(self, vehicle_nickname, start_date, window_size):
+    def _collect_averages(self, days, start_date, window_size):
+        ## rolling sums over the last window_size days: each day is added once and dropped once
         records = []
-        sql = f"""
-            SELECT * 
-            FROM qtrips 
-            WHERE TRUE 
-            AND vehicle_nickname = '{vehicle_nickname}'
-            ORDER BY date
-        """
-        trips = self.turo_db.query(sql)
-        trips = to_munch(trips)
-
-        trip_index = 0
-        trip = trips[trip_index]
+        window_size = max(window_size or 1, 1)
+        window = deque()
+        count = daily_earnings = daily_distance_traveled = 0
         the_date = start_date
         end_date = datetime.now().date()
-        window = [None] * window_size
         while the_date <= end_date:
-            trip = None
-            if trip_index < len(trips):
-                trip = trips[trip_index]
-            if trip and the_date == trip.date.date():
-                # print(trip.date, trip.daily_earnings, trip.daily_distance_traveled)
-                window.append(trip)
-                window.pop(0)
-                trip_index += 1
-            else:
-                # print(the_date, None, None)
-                trip = None # for record.booked, below
-                window.append(None)
-                window.pop(0)
-            record = self._aggregate_data(window)
+            day = days.get(the_date)
+            window.append(day)
+            if day is not None:
+                count += 1
+                daily_earnings += day[0]
+                daily_distance_traveled += day[1]
+            if len(window) > window_size:
+                old = window.popleft()
+                if old is not None:
+                    count -= 1
+                    daily_earnings -= old[0]
+                    daily_distance_traveled -= old[1]
+            record = DefaultMunch()
+            record.count = count
+            record.daily_earnings = daily_earnings
+            record.daily_distance_traveled = daily_distance_traveled
+            record.avg_count = round(count / window_size * 100, 1)
+            record.avg_earnings = round(daily_earnings / count if count else 0, 2)
+            record.avg_distance = round(daily_distance_traveled / count if count else 0, 0)
             record.index = len(records)
             record.date = the_date
-            record.booked = 1 if trip is not None else 0
+            record.booked = 1 if day is not None else 0
             records.append(record)
             the_date += timedelta(days=1)
         return records
@@ -135,16 +139,18 @@ class TuroTrendsTile(PMTile):
         traces = self._trends.traces
         self.plot_config = PMPlotComponentConfig(self.x_axis_config, self.y_axis_config, rect=self.bitmap.rect, title=self._trends.title)
         self.plot = PMPlotComponent(self.bitmap.gfx, self.plot_config)
+        trips = self._trips_by_vehicle(list(dict.fromkeys(trace_cfg.nickname for trace_cfg in traces)))
         for trace_cfg in traces:
-            print(132, trace_cfg, self._trends.window_size)
-            records = self._collect_averages(trace_cfg.nickname, start_date=start_date, window_size=self._trends.window_size or delta_days)
+            records = self._collect_averages(trips[trace_cfg.nickname], start_date=start_date, window_size=self._trends.window_size or delta_days)
             trace = TuroTrendsTraceConfig(**trace_cfg)
             points = []
+            x_values = []
             for record in records:
-                self.x_axis_config.data.append(self._date_to_datetime(record.date))
+                x_values.append(self._date_to_datetime(record.date))
                 point = PMPointConfig(
                     y=record[trace_cfg.column],
                 )
                 points.append(point)
-            self.plot.add_trace(trace, points)
+            ## one point per day since start_date: add_trace thins it to the plot's width
+            self.plot.add_trace(trace, points, x=x_values)
         return True
@@ -9,7 +9,7 @@ from pymirror.pmtile import PMTile
 from tables.turo_trips_table import TuroTripsTable
 from tables.turo_vehicles_table import TuroVehiclesTable
 
-from tiles.turo_calculations import annual_income, annual_sum_of_days
+from tiles.turo_aggregates import TuroAggregates
 
 @dataclass
 class TuroTripConfig:
@@ -174,9 +174,11 @@ class TuroTripTile(PMTile):
         if self._trip.hide_vehicle_name:
             return x, y
         gfx = self.bitmap.gfx_push()
-        booked_income = round(annual_income(vehicle_trips, ["Booked", "In-progress"]))
-        completed_income = round(annual_income(vehicle_trips, ["Completed"]))
-        days = annual_sum_of_days(vehicle_trips, ["Booked", "In-progress", "Completed"])
+        ## totals for the year being shown, summed in SQL (see exec)
+        year = self.cal.start.year
+        booked_income = round(self.totals.income(vehicle_name, ["Booked", "In-progress"], year))
+        completed_income = round(self.totals.income(vehicle_name, ["Completed"], year))
+        days = self.totals.days(vehicle_name, ["Booked", "In-progress", "Completed"], year)
         total_income = booked_income + completed_income
         average_income = round(total_income / days, 2) if days > 0 else 0
         vehicle_name = f"{vehicle_name} - ${str(completed_income)} (${str(booked_income)}) => ${str(total_income)} ({str(days)}d * ${str(average_income)}/day)"
@@ -243,7 +245,9 @@ class TuroTripTile(PMTile):
             return False
             # return is_dirty # early exit if not timed out
         self.timer.reset(self._trip.refresh_time)
-        rows = self.turo_db.get_all_where(TuroTripsTable, f"vehicle_nickname='{self._trip.vehicle_nickname}'", order_by="trip_start")
+        self.totals = TuroAggregates.for_db(self.turo_db)
+        self.totals.refresh()
+        rows = self.turo_db.get_all_where(TuroTripsTable, "vehicle_nickname = :vehicle_nickname", order_by="trip_start", params={"vehicle_nickname": self._trip.vehicle_nickname})
         self.trips = []
         last_trip = None
         for row in rows:
@@ -263,7 +267,7 @@ class TuroTripTile(PMTile):
                 self.trips.append(personal_trip)
             self.trips.append(trip)
             last_trip = trip
-        rows = self.turo_db.get_all_where(TuroVehiclesTable, f"nickname='{self._trip.vehicle_nickname}'")
+        rows = self.turo_db.get_all_where(TuroVehiclesTable, "nickname = :nickname", params={"nickname": self._trip.vehicle_nickname})
         rows = sorted(rows, key=lambda x: x.vehicle_id)
         self.vehicles = DefaultMunch()
         for row in rows:
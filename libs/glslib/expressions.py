@@ -0,0 +1,55 @@
+import ast
+from functools import lru_cache
+
+## small python expressions from config files (labels, widths, ...)
+## compiled once, and only a safe subset of python is allowed: no dunders, no private attributes,
+## no lambdas/comprehensions, and only the builtins below can be called
+
+SAFE_BUILTINS = {f.__name__: f for f in (abs, bool, float, int, len, max, min, round, str, sum)}
+_GLOBALS = {"__builtins__": SAFE_BUILTINS}
+
+_ALLOWED = (
+    ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp, ast.Call, ast.keyword,
+    ast.Name, ast.Load, ast.Constant, ast.JoinedStr, ast.FormattedValue, ast.Attribute,
+    ast.Subscript, ast.Slice, ast.Tuple, ast.List, ast.Dict,
+    ast.operator, ast.boolop, ast.cmpop, ast.unaryop,
+)
+
+def _check(node: ast.AST, source: str):
+    for n in ast.walk(node):
+        if not isinstance(n, _ALLOWED):
+            raise ValueError(f"{type(n).__name__} is not allowed in expression: {source}")
+        if isinstance(n, ast.Name) and n.id.startswith("__"):
+            raise ValueError(f"{n.id} is not allowed in expression: {source}")
+        if isinstance(n, ast.Attribute) and n.attr.startswith("_"):
+            raise ValueError(f".{n.attr} is not allowed in expression: {source}")
+        if isinstance(n, ast.Call) and not (isinstance(n.func, ast.Name) and n.func.id in SAFE_BUILTINS):
+            raise ValueError(f"only {', '.join(SAFE_BUILTINS)} can be called in expression: {source}")
+
+@lru_cache(maxsize=256)
+def compile_expression(source: str):
+    """ The code object for source (checked and compiled once per distinct source) """
+    tree = ast.parse(source, mode="eval")
+    _check(tree, source)
+    return compile(tree, f"<expression {source!r}>", "eval")
+
+def evaluate(code, names):
+    """ Evaluate a compiled expression; names is any mapping (eg: a RowView) """
+    return eval(code, _GLOBALS, names)
+
+class RowView:
+    """
+    A read-only mapping over several dicts (the first one that has a key wins).
+    Point it at the next row by replacing maps, rather than merging the dicts for every row.
+    """
+    __slots__ = ("maps",)
+
+    def __init__(self, *maps):
+        self.maps = list(maps)
+
+    def __getitem__(self, key):
+        for m in self.maps:
+            ## dict's own lookup, so a DefaultMunch doesn't answer None for a builtin like round
+            if dict.__contains__(m, key):
+                return dict.__getitem__(m, key)
+        raise KeyError(key)
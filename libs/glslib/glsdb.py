@@ -1,6 +1,10 @@
 from datetime import datetime
+from functools import lru_cache
+import re
+import time
 from munch import DefaultMunch 
-from sqlalchemy import Table, create_engine, Column, Integer, String, text
+from sqlalchemy import Table, create_engine, Column, Integer, String, delete, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from glslib.dicts import from_dict
@@ -27,13 +31,58 @@ class NullRecord:
 global null_record
 null_record = NullRecord()
 
+## legacy str.format() placeholders: '{name}' or {name}
+## (string literals are matched whole, so a placeholder inside one can be caught)
+_format_token = re.compile(r"'((?:[^']|'')*)'|\{(\w+)\}")
+_format_placeholder = re.compile(r"\{(\w+)\}")
+
+def _to_bind(match: re.Match) -> str:
+    literal, name = match.groups()
+    if name:
+        return f":{name}"
+    quoted = _format_placeholder.fullmatch(literal)
+    if quoted:
+        return f":{quoted.group(1)}"
+    if _format_placeholder.search(literal):
+        ## a bind inside a literal is just text to SQLite: concatenate it instead, eg: '-' || :n || ' month'
+        raise ValueError(f"placeholder inside a quoted literal can't be bound: '{literal}'")
+    return match.group(0)
+
+def format_to_binds(sql: str) -> str:
+    """Rewrite str.format() placeholders ('{name}' or {name}) as named binds (:name)"""
+    return _format_token.sub(_to_bind, sql)
+
+@lru_cache(maxsize=128)
+def _prepare(sql: str):
+    ## text() statements are immutable, so they can be shared by every GLSDb
+    ## repeated queries then also hit SQLAlchemy's compiled cache by the same key
+    return text(sql)
+
 class GLSDb:
-    def __init__(self, url: str):
+    def __init__(self, url: str, write_behind: bool = False, flush_secs: float = 0):
         self.url = url
         self.engine = create_engine(url)
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
         self.session = self.Session()
+        ## write-behind: upsert_many/delete_many are queued until flush()
+        ## so many small writes become one transaction (one fsync)
+        self.write_behind = write_behind
+        self.flush_secs = flush_secs
+        self.last_flush_time = time.time()
+        self._pending_upserts = {}  # (table, index_elements) -> {key: record}
+        self._pending_deletes = {}  # (table, column) -> set of keys
+
+    def add_columns(self, table: Table):
+        """Add columns that are in the model but missing from an existing table (ALTER TABLE ADD COLUMN)"""
+        existing = {column["name"] for column in inspect(self.engine).get_columns(table.__tablename__)}
+        with self.engine.begin() as conn:
+            for column in table.__table__.columns:
+                if column.name in existing:
+                    continue
+                coltype = column.type.compile(dialect=self.engine.dialect)
+                _debug(f"adding column {table.__tablename__}.{column.name} {coltype}")
+                conn.execute(text(f"ALTER TABLE {table.__tablename__} ADD COLUMN {column.name} {coltype}"))
 
     def create_table(self, table: Table, checkfirst=True, force=False):
         try:
@@ -65,9 +114,83 @@ class GLSDb:
         self.session.merge(record)
         self.commit()
 
-    def query(self, sql: str, params=None):
+    def upsert_many(self, table: Table, records: list[dict], index_elements: list[str] = None):
+        """Queue INSERT ... ON CONFLICT DO UPDATE for each record (dicts of column values).
+        index_elements defaults to the primary key; later values for the same key win (column by column)."""
+        index_elements = tuple(index_elements or [c.name for c in table.__table__.primary_key])
+        pending = self._pending_upserts.setdefault((table, index_elements), {})
+        for record in records:
+            key = tuple(record[k] for k in index_elements)
+            pending[key] = {**pending[key], **record} if key in pending else record
+            if len(index_elements) == 1:
+                deletes = self._pending_deletes.get((table, index_elements[0]))
+                if deletes: deletes.discard(key[0])
+        if not self.write_behind:
+            self.flush()
+
+    def delete_many(self, table: Table, keys: list, column: str = None):
+        """Queue a DELETE of every row whose column (default: primary key) is in keys"""
+        column = column or table.__table__.primary_key.columns.values()[0].name
+        pending = self._pending_deletes.setdefault((table, column), set())
+        pending.update(keys)
+        upserts = self._pending_upserts.get((table, (column,)))
+        if upserts:
+            for key in keys:
+                upserts.pop((key,), None)
+        if not self.write_behind:
+            self.flush()
+
+    def pending_upsert(self, table: Table, key: tuple, index_elements: list[str] = None) -> dict:
+        """The column values queued by upsert_many for key (a tuple of the index_elements' values) and not yet flushed ({} if none)"""
+        index_elements = tuple(index_elements or [c.name for c in table.__table__.primary_key])
+        return self._pending_upserts.get((table, index_elements), {}).get(key, {})
+
+    def has_pending(self) -> bool:
+        return any(self._pending_upserts.values()) or any(self._pending_deletes.values())
+
+    def is_flush_due(self) -> bool:
+        return time.time() - self.last_flush_time >= self.flush_secs
+
+    def flush(self):
+        """Write all queued upserts/deletes (and pending session changes) in one transaction.
+        If it fails (eg: database is locked) it's rolled back and the queue is kept, for the next flush to retry."""
+        self.last_flush_time = time.time()
+        if not self.has_pending():
+            return
+        try:
+            for (table, index_elements), pending in self._pending_upserts.items():
+                ## one executemany per distinct column set (partial updates leave other columns alone)
+                batches = {}
+                for record in pending.values():
+                    batches.setdefault(tuple(record.keys()), []).append(record)
+                for keys, records in batches.items():
+                    stmt = sqlite_insert(table.__table__)
+                    columns = [k for k in keys if k not in index_elements]
+                    if columns:
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=list(index_elements),
+                            set_={c: stmt.excluded[c] for c in columns})
+                    else:
+                        stmt = stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+                    self.session.execute(stmt, records)
+            for (table, column), keys in self._pending_deletes.items():
+                if not keys: continue
+                self.session.execute(delete(table.__table__).where(table.__table__.c[column].in_(keys)))
+            self.session.commit()
+        except Exception:
+            self.rollback()
+            raise
+        self._pending_upserts.clear()
+        self._pending_deletes.clear()
+
+    def prepare(self, sql: str):
+        """Return the cached text() statement for sql"""
+        return _prepare(sql)
+
+    def query(self, sql: str, params: dict = None):
+        """Run sql with named binds (:name) taken from params"""
         with self.engine.connect() as conn:
-            result = conn.execute(text(sql), params or {})
+            result = conn.execute(self.prepare(sql), params or {})
             keys = list(result.keys())
             result_list = []
             for row in result.fetchall():
@@ -98,25 +221,26 @@ class GLSDb:
         return records
 
     # @tracebacker(null_record)
-    def get_where(self, table: Table, where_clause, order_by=None) -> list["Table"]:
-        if type(where_clause) == str:
-            where_clause = text(where_clause)
-        query = self.session.query(table).filter(where_clause)
-        if order_by is not None:
-            query = query.order_by(order_by)
-        print(query)
+    def get_where(self, table: Table, where_clause, order_by=None, params: dict = None) -> list["Table"]:
+        query = self._where(table, where_clause, order_by, params)
         records = query.first()
         return records
 
     @tracebacker([])
-    def get_all_where(self, table: Table, where_clause, order_by=None) -> list["Table"]:
+    def get_all_where(self, table: Table, where_clause, order_by=None, params: dict = None) -> list["Table"]:
+        query = self._where(table, where_clause, order_by, params)
+        records = query.all()
+        return records
+
+    def _where(self, table: Table, where_clause, order_by=None, params: dict = None):
         if type(where_clause) == str:
-            where_clause = text(where_clause)
+            where_clause = self.prepare(where_clause)
         query = self.session.query(table).filter(where_clause)
+        if params:
+            query = query.params(**params)
         if order_by is not None:
             query = query.order_by(order_by)
-        records = query.all()
-        return records
+        return query
 
     def delete(self, record: Table):
         self.session.delete(record)
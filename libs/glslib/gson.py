@@ -2,9 +2,18 @@ import sys
 
 import json5
 import json
-from glslib.logger import _print
+from collections import Counter
+from glslib.logger import _debug, _print
 from dataclasses import is_dataclass
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+## how many json_loads() calls took each path: "orjson" / "json" (strict, C) or "json5" (fallback)
+json_loads_paths = Counter()
+
 def json_read(fname: str, dflt=None) -> dict:
     with open(fname, 'r') as file:
         s = file.read()
@@ -15,9 +24,24 @@ def json_write(fname: str, obj: dict) -> bool:
         file.write(json_loads(obj))
         return 
 
+def json_loads_path(s: str) -> tuple[dict, str]:
+    """Parse s with the fastest parser that accepts it; returns (obj, path taken)"""
+    ## strict json (API payloads, event bodies) is 50-100x faster in C
+    ## json5 (comments, trailing commas, unquoted keys in configs) is only tried on a syntax error
+    try:
+        if orjson:
+            return orjson.loads(s), "orjson"
+        return json.loads(s), "json"
+    except ValueError:
+        return json5.loads(s), "json5"
+
 def json_loads(s: str, dflt=None) -> dict:
     # try:
-        return json5.loads(s)
+        obj, path = json_loads_path(s)
+        json_loads_paths[path] += 1
+        if path == "json5":
+            _debug("json_loads: fell back to json5")
+        return obj
     # except Exception as e:
     #     err_msg = str(e)
     #     words = err_msg.split(" ")
@@ -45,4 +69,26 @@ def json_dumps(d: dict, dflt=None, indent=2) -> str:
         return dflt
 
 def json_print(d: dict, dflt=None, indent=2, file=sys.stdout):
-    print(json_dumps(d, dflt=dflt, indent=indent), file=file)
\ No newline at end of file
+    print(json_dumps(d, dflt=dflt, indent=indent), file=file)
+
+if __name__ == "__main__":
+    ## benchmark: python -m glslib.gson [files...] (default: samples/*.json and configs/**/*.json)
+    import glob
+    import timeit
+
+    def main():
+        fnames = sys.argv[1:] or sorted(glob.glob("samples/*.json") + glob.glob("configs/**/*.json", recursive=True))
+        totals = Counter()
+        print(f"{'file':48} {'bytes':>8} {'path':>7} {'tiered ms':>10} {'json5 ms':>10} {'speedup':>8}")
+        for fname in fnames:
+            with open(fname) as file:
+                s = file.read()
+            _, path = json_loads_path(s)
+            n = 10
+            tiered = timeit.timeit(lambda: json_loads_path(s), number=n) / n * 1000
+            slow = timeit.timeit(lambda: json5.loads(s), number=n) / n * 1000
+            totals["tiered"] += tiered
+            totals["json5"] += slow
+            print(f"{fname[-48:]:48} {len(s):8} {path:>7} {tiered:10.3f} {slow:10.3f} {slow / tiered:7.1f}x")
+        print(f"{'total':48} {'':8} {'':>7} {totals['tiered']:10.3f} {totals['json5']:10.3f} {totals['json5'] / max(totals['tiered'], 1e-9):7.1f}x")
+    main()
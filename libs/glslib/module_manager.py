@@ -1,9 +1,11 @@
 import re
 import importlib.util
 import importlib.abc
+import importlib.machinery
 import sys
 import os
-from glslib.logger import _die, _debug, _error
+import time
+from glslib.logger import _die, _debug, _error, _print
 
 # Custom loader for loading code from bytes (from zip)
 class ZipTileLoader(importlib.abc.Loader):
@@ -33,9 +35,60 @@ def _extract_imports(code):
             imports.append(from_import_match.group(1))
     return list(imports)
 
+class _TimedSourceLoader(importlib.machinery.SourceFileLoader):
+    """Source loader that records how long the module took to import (including its own imports)"""
+    def exec_module(self, module):
+        start = time.perf_counter()
+        try:
+            super().exec_module(module)
+        finally:
+            TileManager.import_times[self.name] = (time.perf_counter() - start) * 1000
+
+class _LazyModuleFinder(importlib.abc.MetaPathFinder):
+    """Finds modules registered with TileManager.register_module; nothing is executed until first import"""
+    def __init__(self):
+        self.registry = {} # "tiles.turo_plot_tile" -> filename
+
+    def find_spec(self, fullname, path=None, target=None):
+        filename = self.registry.get(fullname)
+        if filename is None:
+            return None
+        return importlib.util.spec_from_file_location(fullname, filename, loader=_TimedSourceLoader(fullname, filename))
+
 class TileManager:
+    import_times = {} # module name -> import time (ms)
+    _finder = None
+
     def __init__(self):
         pass
+
+    @staticmethod
+    def register_module(folder, package_name, module_name):
+        ## make "package_name.module_name" importable without importing it
+        if TileManager._finder is None:
+            TileManager._finder = _LazyModuleFinder()
+            sys.meta_path.insert(0, TileManager._finder)
+        filename = os.path.abspath(os.path.join(folder, module_name + ".py"))
+        _debug(f"Registering module {package_name}.{module_name} from {filename}...")
+        TileManager._finder.registry[f"{package_name}.{module_name}"] = filename
+
+    @staticmethod
+    def import_module(name: str):
+        ## importlib.import_module(), timing the first import of name
+        if name in sys.modules:
+            return sys.modules[name]
+        start = time.perf_counter()
+        try:
+            return importlib.import_module(name)
+        finally:
+            TileManager.import_times.setdefault(name, (time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def print_import_times():
+        ## times include nested imports, so they don't add up
+        for name, ms in sorted(TileManager.import_times.items(), key=lambda item: -item[1]):
+            _print(f"  {ms:8.1f} ms  {name}")
+        _print(f"  imported {len(TileManager.import_times)} modules")
     
     @staticmethod
     def append_module(folder, package_name, module_name):
@@ -48,7 +101,7 @@ class TileManager:
         spec.loader.exec_module(module)
 
     @staticmethod
-    def load_modules(folder: str, package_name: str, die_trying: bool = False):
+    def load_modules(folder: str, package_name: str, die_trying: bool = False, lazy: bool = True):
         _debug(f"Loading modules from package {package_name} in folder {folder}...")
         path = os.path.abspath(folder)
         _debug(f"Resolved path: {path}")
@@ -69,4 +122,7 @@ class TileManager:
                 lines = f.read().splitlines()
                 imports = _extract_imports("\n".join(lines))
             for module in imports:
-                TileManager.append_module(package_path, package_name, module)
+                if lazy:
+                    TileManager.register_module(package_path, package_name, module)
+                else:
+                    TileManager.append_module(package_path, package_name, module)
@@ -0,0 +1,55 @@
+import hashlib
+import marshal
+import zlib
+
+from glslib.gson import json_loads
+from glslib.logger import _debug
+
+## Payloads (eg: web api responses) are stored as:
+##   hash     - sha1 of the raw text, so readers can tell "same as last time" without decoding
+##   zip      - zlib compressed raw text
+##   snapshot - zlib compressed marshal of the parsed object, so readers skip json parsing
+## marshal is only guaranteed between identical python versions, so a snapshot that
+## won't load falls back to parsing the text.
+
+def payload_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def pack_payload(text: str, obj=None) -> dict:
+    """Return the hash/zip/snapshot columns for a payload text (obj is the parsed text, if known)"""
+    if text is None:
+        return dict(hash=None, zip=None, snapshot=None)
+    if obj is None:
+        try:
+            obj = json_loads(text)
+        except Exception as e:
+            _debug("pack_payload: not json...", e)
+    snapshot = None
+    if obj is not None:
+        try:
+            snapshot = zlib.compress(marshal.dumps(obj))
+        except ValueError as e:
+            _debug("pack_payload: can't marshal...", e)
+    return dict(
+        hash=payload_hash(text),
+        zip=zlib.compress(text.encode("utf-8")),
+        snapshot=snapshot,
+    )
+
+def unpack_text(zipped: bytes, text: str = None) -> str:
+    """The raw payload text (text is the legacy uncompressed column)"""
+    if zipped:
+        return zlib.decompress(zipped).decode("utf-8")
+    return text
+
+def unpack_payload(snapshot: bytes, zipped: bytes, text: str = None):
+    """The parsed payload, from the snapshot if possible"""
+    if snapshot:
+        try:
+            return marshal.loads(zlib.decompress(snapshot))
+        except Exception as e:
+            _debug("unpack_payload: bad snapshot...", e)
+    text = unpack_text(zipped, text)
+    if not text:
+        return None
+    return json_loads(text)
@@ -0,0 +1,128 @@
+import copy
+import os
+import re
+
+from glslib.logger import _debug
+from glslib.strings import expand_dict, expand_string
+
+## A Projection turns a "display" spec like
+##   {"total": "{{payload.totalResults}}", "max": "100",
+##    "header": "{{_n_}}: {{payload.articles[_n_].title}}", ...}
+## into a list of items, one per _n_, exactly as expanding every field with jinja would.
+## Fields made only of literal text and plain paths ({{payload.articles[_n_].title}})
+## are compiled once into path getters; anything else ({{ x.split('T')[0] }}, {% if %}, ...)
+## is a "computed" field and is rendered by jinja (see expand_string).
+
+_expr_re = re.compile(r"\{\{(.*?)\}\}", re.S)
+_path_re = re.compile(r"""^\s*([A-Za-z_]\w*)((?:\.[A-Za-z_]\w*|\[\s*(?:-?\d+|[A-Za-z_]\w*|'[^']*'|"[^"]*")\s*\])*)\s*$""")
+_step_re = re.compile(r"""\.([A-Za-z_]\w*)|\[\s*(-?\d+|[A-Za-z_]\w*|'[^']*'|"[^"]*")\s*\]""")
+
+class _Miss(Exception):
+    """A path that jinja would resolve differently (missing key, attribute, ...)"""
+
+def _attr_step(name):
+    def step(obj, context):
+        ## jinja tries getattr() before [] for dotted names, so let jinja handle those
+        if hasattr(obj, name):
+            raise _Miss(name)
+        try:
+            return obj[name]
+        except Exception:
+            raise _Miss(name)
+    return step
+
+def _item_step(arg):
+    if arg[0] in "'\"":
+        key = arg[1:-1]
+        lookup = lambda context: key
+    elif arg.lstrip("-").isdigit():
+        key = int(arg)
+        lookup = lambda context: key
+    else:
+        lookup = lambda context: context[arg]
+    def step(obj, context):
+        try:
+            return obj[lookup(context)]
+        except Exception:
+            raise _Miss(arg)
+    return step
+
+def _compile_path(expr: str):
+    """A getter for a plain path expression, or None if expr is computed"""
+    match = _path_re.match(expr)
+    if not match:
+        return None
+    name = match.group(1)
+    steps = [_attr_step(attr) if attr else _item_step(arg) for attr, arg in _step_re.findall(match.group(2))]
+    def getter(context):
+        if name not in context:
+            raise _Miss(name)
+        value = context[name]
+        for step in steps:
+            value = step(value, context)
+        return value
+    return getter
+
+def compile_template(s: str):
+    """A list of literal strings and path getters for s, or None if s needs jinja"""
+    s = os.path.expandvars(s)
+    if "{%" in s or "{#" in s or "\r" in s:
+        return None
+    parts = []
+    chunks = _expr_re.split(s)
+    for i, chunk in enumerate(chunks):
+        if i % 2 == 0:
+            if "{{" in chunk or "}}" in chunk:
+                return None
+            if chunk:
+                parts.append(chunk)
+            continue
+        getter = _compile_path(chunk)
+        if getter is None:
+            return None
+        parts.append(getter)
+    ## jinja drops a single trailing newline
+    if parts and type(parts[-1]) is str and parts[-1].endswith("\n"):
+        parts[-1] = parts[-1][:-1]
+    return parts
+
+class Projection:
+    def __init__(self, display: dict):
+        self.display = display
+        self.compiled = {}
+        for key, value in display.items():
+            if isinstance(value, str):
+                self.compiled[key] = compile_template(value)
+        _debug("Projection computed fields:", [key for key, parts in self.compiled.items() if parts is None])
+
+    def render(self, key: str, context: dict, dflt: str = None):
+        value = self.display[key]
+        if isinstance(value, (dict, list)):
+            nested = {key: copy.deepcopy(value)}
+            expand_dict(nested, context, dflt)
+            return nested[key]
+        if not isinstance(value, str):
+            return value
+        parts = self.compiled[key]
+        if parts is not None:
+            try:
+                return "".join(part if type(part) is str else str(part(context)) for part in parts)
+            except _Miss:
+                pass
+        return expand_string(value, context, dflt)
+
+    def project(self, payload, dflt: str = "__error__") -> list[dict]:
+        """All the display items for payload (items with a field that fails to render are skipped)"""
+        context = {"_n_": 0, "payload": payload}
+        max_items = int(self.render("max", context) if "max" in self.display else "1")
+        total_items = int(self.render("total", context) if "total" in self.display else "1")
+        if total_items > max_items:
+            total_items = max_items
+        items = []
+        for n in range(total_items):
+            context["_n_"] = n
+            item = {key: self.render(key, context, dflt) for key in self.display}
+            if dflt in item.values():
+                continue
+            items.append(item)
+        return items
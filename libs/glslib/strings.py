@@ -1,5 +1,6 @@
 from dataclasses import dataclass, is_dataclass, fields
 from datetime import datetime, timedelta
+from functools import lru_cache
 from jinja2 import Environment, DebugUndefined
 import os
 import re
@@ -18,14 +19,23 @@ def pascal_to_snake(pascal_str):
             result += c
     return result
 
+## one Environment for every expansion; compiled templates are cached by source
+_env = Environment(undefined=DebugUndefined)
+
+@lru_cache(maxsize=1024)
+def _compile(s: str):
+    return _env.from_string(s)
+
 def expand_string(s: str, context: dict, dflt: str = None) -> str:
     if not s:
         return s
     if not isinstance(s, str):
         return s
+    if "{" not in s and "$" not in s:
+        ## nothing to expand... but match jinja, which drops a single trailing newline
+        return s[:-1] if s.endswith("\n") else s
     s = os.path.expandvars(s)
-    env = Environment(undefined=DebugUndefined)
-    template = env.from_string(s)
+    template = _compile(s)
     try:
         s = template.render(**context)
     except Exception as e:
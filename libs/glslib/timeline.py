@@ -0,0 +1,125 @@
+import builtins
+from contextlib import contextmanager
+import json
+import os
+import sys
+import threading
+import time
+
+class Timeline:
+    """
+    A hierarchical wall-clock timeline of startup phases (config, imports, tile init, first render...).
+    Spans nest by time, so the trace viewer shows them as a tree, with one track per thread
+    (tiles are imported and constructed on worker threads).
+    Written as Chrome trace JSON (chrome://tracing or ui.perfetto.dev) plus a text summary.
+    Does nothing until start() is called.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.events = []  # (name, cat, start, dur, depth, tid, args)
+        self._t0 = time.perf_counter()
+        self._local = threading.local()  # the span depth of each thread
+        self._threads = {}  # thread ident -> (tid, thread name); the main thread is tid 1
+        self._lock = threading.Lock()
+        self._import = None
+
+    def start(self, imports: bool = True):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._t0 = time.perf_counter()
+        self._tid()
+        if imports and self._import is None:
+            ## every first import becomes an "import" span
+            self._import = builtins.__import__
+            builtins.__import__ = self._timed_import
+
+    def stop(self):
+        if self._import is not None:
+            builtins.__import__ = self._import
+            self._import = None
+        self.enabled = False
+
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        thread = self._threads.get(ident)
+        if thread is None:
+            with self._lock:
+                thread = self._threads.setdefault(ident, (len(self._threads) + 1, threading.current_thread().name))
+        return thread[0]
+
+    @contextmanager
+    def span(self, name: str, cat: str = "startup", **args):
+        if not self.enabled:
+            yield
+            return
+        tid = self._tid()
+        depth = getattr(self._local, "depth", 0)
+        start = time.perf_counter()
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            ## list.append is atomic, so the worker threads can share the list
+            self.events.append((name, cat, start, time.perf_counter() - start, depth, tid, args))
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        with self.span(name, "import"):
+            return self._import(name, globals, locals, fromlist, level)
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+            for tid, thread_name in self._threads.values()
+        ]
+        for name, cat, start, dur, depth, tid, args in sorted(self.events, key=lambda e: (e[2], e[4])):
+            events.append({
+                "name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+                "ts": round((start - self._t0) * 1e6), "dur": round(dur * 1e6),
+                "args": {k: str(v) for k, v in args.items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self, min_ms: float = 1.0) -> str:
+        lines = []
+        totals = {}
+        thread_names = dict(self._threads.values())
+        for name, cat, start, dur, depth, tid, args in sorted(self.events, key=lambda e: (e[5], e[2], e[4])):
+            if depth == 0:
+                totals[cat] = totals.get(cat, 0) + dur
+            if dur * 1000 < min_ms:
+                continue
+            label = f"import {name}" if cat == "import" else name
+            if tid != 1:
+                label = f"[{thread_names[tid]}] {label}"
+            lines.append(f"{(start - self._t0) * 1000:9.1f} {dur * 1000:9.1f} ms  {'  ' * depth}{label}")
+        lines.insert(0, f"{'start':>9} {'duration':>12}  (spans under {min_ms} ms hidden)")
+        lines.append("")
+        for cat, dur in sorted(totals.items(), key=lambda item: -item[1]):
+            lines.append(f"{'':9} {dur * 1000:9.1f} ms  total top-level {cat}")
+        return "\n".join(lines)
+
+    def write(self, prefix: str):
+        """Write <prefix>.trace.json and <prefix>.txt"""
+        with open(prefix + ".trace.json", "w") as file:
+            json.dump(self.to_chrome_trace(), file)
+        with open(prefix + ".txt", "w") as file:
+            file.write(self.summary() + "\n")
+
+## one timeline per process
+timeline = Timeline()
+
+if __name__ == "__main__":
+    def main():
+        timeline.start()
+        with timeline.span("outer"):
+            with timeline.span("inner", n=1):
+                import json5
+                time.sleep(0.01)
+        timeline.stop()
+        print(timeline.summary())
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import csv
+from datetime import datetime
+import hashlib
+from itertools import islice
+import re
+import sys
+import time
+sys.path.append("./libs")
+sys.path.append("./extensions/turo/tables")
+
+from sqlalchemy import Column, DateTime, Float, Integer, String, bindparam, insert, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import declarative_base
+
+from glslib.glsdb import GLSDb
+from glslib.strings import expand_string
+from turo_trips_table import TuroTripsTable
+
+## import a trips.csv export into the trips table
+## rows are matched by reservation_id; a row whose CSV cells are unchanged (same row_hash) isn't written at all,
+## so re-importing a multi-year export only touches the trips that are new or edited
+## the hashes live in their own table, so the trips table (which the tiles read) keeps its shape
+
+Base = declarative_base()
+
+class TripHashesTable(Base):
+    __tablename__ = 'trip_hashes'
+    reservation_id = Column(Integer, primary_key=True)
+    row_hash = Column(String)
+
+DATE_FORMATS = ["%m/%d/%Y %I:%M %p", "%Y-%m-%d %I:%M %p", "%m/%d/%Y %H:%M", "%m/%d/%Y"]
+
+def _column_name(header: str) -> str:
+    ## "Reservation ID" -> reservation_id (so both Turo's headers and our own trips.csv work)
+    return re.sub(r"[^a-z0-9]+", "_", header.strip().lower()).strip("_")
+
+def _to_int(s: str):
+    s = s.replace(",", "").strip()
+    return int(float(s)) if s else None
+
+def _to_float(s: str):
+    s = s.replace("$", "").replace(",", "").strip()
+    if s.startswith("(") and s.endswith(")"):
+        s = "-" + s[1:-1]
+    return float(s) if s else None
+
+def _to_datetime(s: str):
+    s = s.strip()
+    if not s:
+        return None
+    try:
+        return datetime.fromisoformat(s)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognized date: {s}")
+
+def _to_str(s: str):
+    return s if s != "" else None
+
+def _converter(column):
+    if isinstance(column.type, Integer): return _to_int
+    if isinstance(column.type, Float): return _to_float
+    if isinstance(column.type, DateTime): return _to_datetime
+    return _to_str
+
+def _plan(header: list) -> list:
+    """ (csv index, column name, converter) for every CSV column that's in the trips table, worked out once """
+    columns = TuroTripsTable.__table__.columns
+    plan = []
+    for i, name in enumerate(header):
+        name = _column_name(name)
+        if name in columns and name != "id":
+            plan.append((i, name, _converter(columns[name])))
+    if "reservation_id" not in {name for _, name, _ in plan}:
+        raise ValueError("the CSV has no reservation_id column")
+    return plan
+
+def _row_hash(row: list, plan: list) -> str:
+    return hashlib.blake2b("\x1f".join(row[i] if i < len(row) else "" for i, _, _ in plan).encode(), digest_size=16).hexdigest()
+
+def import_trips(db: GLSDb, fname: str, chunk_size: int = 1000) -> dict:
+    """ Stream fname into the trips table in chunks, in one transaction; returns the counts """
+    db.create_table(TuroTripsTable)
+    db.create_table(TripHashesTable)
+    t = TuroTripsTable.__table__
+    h = TripHashesTable.__table__
+    counts = dict(rows=0, inserted=0, updated=0, unchanged=0, skipped=0)
+    with open(fname, newline="") as f, db.engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trips_reservation_id ON trips (reservation_id)"))
+        ## trips imported some other way have no hash yet (None), so they're rewritten once
+        known = dict.fromkeys(conn.execute(select(t.c.reservation_id)).scalars())
+        known.update(conn.execute(select(h.c.reservation_id, h.c.row_hash)).all())
+        reader = csv.reader(f)
+        plan = _plan(next(reader))
+        rid_index = next(i for i, name, _ in plan if name == "reservation_id")
+        update_stmt = update(t).where(t.c.reservation_id == bindparam("_reservation_id"))
+        hash_stmt = sqlite_insert(h)
+        hash_stmt = hash_stmt.on_conflict_do_update(index_elements=["reservation_id"], set_={"row_hash": hash_stmt.excluded.row_hash})
+        while chunk := list(islice(reader, chunk_size)):
+            inserts, updates, hashes = {}, {}, {}
+            for row in chunk:
+                counts["rows"] += 1
+                reservation_id = _to_int(row[rid_index]) if rid_index < len(row) else None
+                if reservation_id is None:
+                    counts["skipped"] += 1
+                    continue
+                row_hash = _row_hash(row, plan)
+                if known.get(reservation_id) == row_hash:
+                    counts["unchanged"] += 1
+                    continue
+                ## only new and changed rows are converted
+                record = {name: convert(row[i]) if i < len(row) else None for i, name, convert in plan}
+                hashes[reservation_id] = dict(reservation_id=reservation_id, row_hash=row_hash)
+                if reservation_id in known:
+                    record["_reservation_id"] = reservation_id
+                    updates[reservation_id] = record
+                else:
+                    inserts[reservation_id] = record
+                known[reservation_id] = row_hash
+            if inserts:
+                conn.execute(insert(t), list(inserts.values()))
+            if updates:
+                conn.execute(update_stmt, list(updates.values()))
+            if hashes:
+                conn.execute(hash_stmt, list(hashes.values()))
+            counts["inserted"] += len(inserts)
+            counts["updated"] += len(updates)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a Turo trips CSV export into the trips table")
+    parser.add_argument("csv_file", nargs="?", default="trips.csv")
+    parser.add_argument("--db", default="sqlite:///$HOME/turo.db")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    db = GLSDb(expand_string(args.db, {}))
+    t0 = time.time()
+    counts = import_trips(db, args.csv_file, args.chunk_size)
+    print(f"{counts['rows']} rows in {time.time() - t0:.2f}s: {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged, {counts['skipped']} skipped (no reservation_id)")
+
+if __name__ == "__main__":
+    main()